@@ -0,0 +1,100 @@
+import threading
+import time
+from collections import OrderedDict
+
+COMPLETED_ROUNDS_KEPT = 1024 # completed round IDs remembered to drop late duplicates
+ROUND_TIMEOUT = 60.0 # seconds after which an incomplete round is abandoned
+MAX_ROUNDS_IN_FLIGHT = 64 # incomplete rounds kept per master, the oldest is abandoned beyond this
+
+# Slave results collected by a master for one round
+class AggregationRound:
+    def __init__(self, roundID, startedAt):
+        self.roundID = roundID
+        self.startedAt = startedAt
+        self.slaveResults = {} # SlaveID-->(architectureList, weight, initiatorTimestamp)
+        self.partial = False # set when a slave result was itself computed from a partial round
+        self.expired = False # set when the round reached its deadline or timeout before completing
+
+# Thread-safe barrier of a master, keyed by round: keeps the results of each slave separately
+# per round so several rounds can be in flight without corrupting each other.
+# A round is decided when all slaves have reported, or as soon as `quorum` slaves have reported;
+# with a deadline, a round still undecided `deadline` seconds after its first message is returned
+# by expire() so the master can aggregate with what it has.
+class AggregationBarrier:
+    def __init__(self, slaveIDs, roundTimeout=ROUND_TIMEOUT, maxRounds=MAX_ROUNDS_IN_FLIGHT, quorum=None, deadline=None):
+        self.slaveIDs = frozenset(slaveIDs)
+        self.roundTimeout = roundTimeout
+        self.maxRounds = maxRounds
+        self.quorum = quorum
+        self.required = len(self.slaveIDs) if quorum is None else max(1, min(quorum, len(self.slaveIDs)))
+        self.deadline = deadline
+        self.lock = threading.Lock()
+        self.pending = OrderedDict() # roundID-->AggregationRound, oldest first
+        self.completed = OrderedDict() # roundID-->None, oldest first
+        self.evicted = [] # rounds pushed out by maxRounds, handed out by the next expire()
+
+    # Record the result of a slave for a round. Returns the decided AggregationRound for the one
+    # message that decides it; duplicates, unknown slaves and messages for finished rounds return None
+    def arrive(self, roundID, slaveID, result, partial=False, now=None):
+        now = time.monotonic() if now is None else now
+        with self.lock:
+            if slaveID not in self.slaveIDs or roundID in self.completed:
+                return None
+            aggregationRound = self.pending.get(roundID)
+            if aggregationRound is None:
+                aggregationRound = self.pending[roundID] = AggregationRound(roundID, now)
+                if len(self.pending) > self.maxRounds:
+                    evicted = self.finish(next(iter(self.pending)))
+                    evicted.expired = True
+                    self.evicted.append(evicted)
+            if slaveID in aggregationRound.slaveResults:
+                return None
+            aggregationRound.slaveResults[slaveID] = result
+            aggregationRound.partial = aggregationRound.partial or partial
+            if len(aggregationRound.slaveResults) < self.required:
+                return None
+            return self.finish(roundID)
+
+    # Rounds still undecided at their deadline (or, without a deadline, abandoned after roundTimeout),
+    # and those pushed out by newer rounds beyond maxRounds before that
+    def expire(self, now=None):
+        now = time.monotonic() if now is None else now
+        limit = self.roundTimeout if self.deadline is None else self.deadline
+        with self.lock:
+            expired, self.evicted = self.evicted, []
+            while self.pending:
+                aggregationRound = next(iter(self.pending.values()))
+                if now - aggregationRound.startedAt < limit:
+                    break
+                aggregationRound.expired = True
+                expired.append(self.finish(aggregationRound.roundID))
+        return expired
+
+    # Called with the lock held
+    def finish(self, roundID):
+        aggregationRound = self.pending.pop(roundID)
+        self.completed[roundID] = None
+        if len(self.completed) > COMPLETED_ROUNDS_KEPT:
+            self.completed.popitem(last=False)
+        return aggregationRound
+
+    # Redeployment changed the slaves: rounds in flight forget the results of removed slaves and are
+    # decided against the new set; those left without any result are dropped, the remaining slaves
+    # start them afresh if they still report them
+    def setSlaves(self, slaveIDs):
+        with self.lock:
+            self.slaveIDs = frozenset(slaveIDs)
+            self.required = len(self.slaveIDs) if self.quorum is None else max(1, min(self.quorum, len(self.slaveIDs)))
+            for roundID, aggregationRound in list(self.pending.items()):
+                for slaveID in set(aggregationRound.slaveResults).difference(self.slaveIDs):
+                    del aggregationRound.slaveResults[slaveID]
+                if not aggregationRound.slaveResults:
+                    del self.pending[roundID]
+
+    # Slaves that have not reported for a round
+    def missing(self, aggregationRound):
+        return self.slaveIDs.difference(aggregationRound.slaveResults)
+
+    def inFlight(self):
+        with self.lock:
+            return len(self.pending)
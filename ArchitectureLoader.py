@@ -0,0 +1,50 @@
+import json
+from DeployerD import Component, JointSet, ArchitectureGenerator
+
+# Architectures as JSON Lines, one record per line, read and written one record at a time:
+#   {"type": "component", "id": "C1", "features": [0.5, 0.7]}
+#   {"type": "jointSet", "id": "O1", "components": ["C1"]}
+#   {"type": "mu", "component": "C1", "jointSet": "O2"}
+# A joint set comes after its components; blank lines are skipped.
+
+def loadArchitecture(path):
+    with open(path, encoding='utf-8') as records:
+        return readArchitecture(records)
+
+# Builds (ArchitectureGenerator, dynamic) from an iterable of lines
+def readArchitecture(lines):
+    generator = ArchitectureGenerator()
+    dynamic = {}
+    for number, line in enumerate(lines, 1):
+        if not line.strip():
+            continue
+        try:
+            addRecord(generator, dynamic, json.loads(line))
+        except (ValueError, KeyError, TypeError) as e:
+            raise ValueError(f"line {number}: {e!r}") from e
+    return generator, dynamic
+
+def addRecord(generator, dynamic, record):
+    kind = record['type']
+    if kind == 'component':
+        generator.addComponent(Component(record['id'], tuple(record['features'])))
+    elif kind == 'jointSet':
+        jointSet = JointSet([generator.components[componentId] for componentId in record['components']], record['id'])
+        jointSet.updateDynamicMap(dynamic)
+        generator.addJointSet(jointSet)
+    elif kind == 'mu':
+        generator.addMappingToMu(record['component'], record['jointSet'])
+    else:
+        raise ValueError(f"unknown record type {kind!r}")
+
+def saveArchitecture(generator, path):
+    with open(path, 'w', encoding='utf-8') as records:
+        for line in writeArchitecture(generator): records.write(line)
+
+def writeArchitecture(generator):
+    for component in generator.components.values():
+        yield json.dumps({'type': 'component', 'id': component.id, 'features': list(component.featureTuple)}) + '\n'
+    for jointSet in generator.jointSets.values():
+        yield json.dumps({'type': 'jointSet', 'id': jointSet.id, 'components': [component.id for component in jointSet.jointComponents]}) + '\n'
+    for componentId, jointSetId in generator.mu.items():
+        yield json.dumps({'type': 'mu', 'component': componentId, 'jointSet': jointSetId}) + '\n'
@@ -0,0 +1,170 @@
+import asyncio
+import time
+from urllib.parse import urlsplit, quote, unquote
+
+# Minimal HTTP/1.1 over asyncio streams, enough for the JSON POSTs exchanged by deployers,
+# control managers and controls (no chunked encoding, bodies always carry content-length)
+
+DEFAULT_POOL_SIZE = 4 # connections kept per destination host
+DEFAULT_IDLE_TIMEOUT = 30.0 # seconds an unused connection stays open
+UNIX_SCHEME = 'unix://' # unix://<percent-encoded socket path>/<request path>
+
+STATUS_REASONS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed', 415: 'Unsupported Media Type',
+                  500: 'Internal Server Error'}
+
+class HttpRequest:
+    def __init__(self, method, path, headers, body):
+        self.method = method
+        self.path = path
+        self.headers = headers # header names are lower-cased
+        self.body = body
+    def keepAlive(self):
+        return self.headers.get('connection', '').lower() != 'close'
+
+async def readHeaders(reader):
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b'\n', b''):
+            return headers
+        name, _, value = line.decode('latin-1').partition(':')
+        headers[name.strip().lower()] = value.strip()
+
+async def readRequest(reader):
+    requestLine = await reader.readline()
+    if not requestLine.strip():
+        return None # connection closed by the client
+    method, path, _ = requestLine.decode('latin-1').split(' ', 2)
+    headers = await readHeaders(reader)
+    body = await reader.readexactly(int(headers.get('content-length', 0)))
+    return HttpRequest(method, path, headers, body)
+
+async def writeResponse(writer, status, body=b'', contentType='text/plain', headers=None, keepAlive=True):
+    head = (f"HTTP/1.1 {status} {STATUS_REASONS.get(status, '')}\r\n"
+            f"Content-Type: {contentType}\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            + ''.join(f"{name}: {value}\r\n" for name, value in (headers or {}).items()) +
+            f"Connection: {'keep-alive' if keepAlive else 'close'}\r\n\r\n")
+    writer.write(head.encode('latin-1') + body)
+    await writer.drain()
+
+# Serve requests on one connection until the client closes it. The handler is a coroutine
+# taking an HttpRequest and returning (status, body), (status, body, contentType) or
+# (status, body, contentType, extra headers).
+async def serveConnection(reader, writer, handler):
+    try:
+        while True:
+            request = await readRequest(reader)
+            if request is None:
+                break
+            try:
+                status, body, *rest = await handler(request)
+            except Exception as e:
+                print(f"An error occured: {e}")
+                status, body, rest = 500, str(e).encode('utf-8'), []
+            await writeResponse(writer, status, body, *rest, keepAlive=request.keepAlive())
+            if not request.keepAlive():
+                break
+    except (asyncio.IncompleteReadError, ConnectionError, ValueError):
+        pass
+    except asyncio.CancelledError:
+        pass # server shutting down, the connection task ends quietly
+    finally:
+        writer.close()
+
+# Accepts 'http://host:port/path', 'host:port/path', 'host:port' or 'unix://<socket>/path'.
+# For Unix domain sockets the host is the socket path and the port is None
+def splitUrl(url):
+    if url.startswith(UNIX_SCHEME):
+        socketPath, _, path = url[len(UNIX_SCHEME):].partition('/')
+        return unquote(socketPath), None, '/' + path
+    if '://' not in url: url = 'http://' + url
+    parts = urlsplit(url)
+    return parts.hostname, parts.port or 80, parts.path or '/'
+
+def unixUrl(socketPath, path=''):
+    return UNIX_SCHEME + quote(socketPath, safe='') + path
+
+async def openConnection(host, port):
+    if port is None:
+        return await asyncio.open_unix_connection(host)
+    return await asyncio.open_connection(host, port)
+
+async def readResponse(reader):
+    statusLine = await reader.readline()
+    if not statusLine:
+        raise ConnectionError("connection closed before the response")
+    status = int(statusLine.split(b' ', 2)[1])
+    headers = await readHeaders(reader)
+    body = await reader.readexactly(int(headers.get('content-length', 0)))
+    return status, headers, body
+
+def encodeRequest(method, host, port, path, body, contentType, keepAlive=True):
+    head = (f"{method} {path} HTTP/1.1\r\n"
+            f"Host: {'localhost' if port is None else f'{host}:{port}'}\r\n"
+            f"Content-Type: {contentType}\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            f"Connection: {'keep-alive' if keepAlive else 'close'}\r\n\r\n")
+    return head.encode('latin-1') + body
+
+# Reusable keep-alive connections, at most maxConnections per (host, port) or Unix socket; connections left
+# idle for more than idleTimeout seconds are closed
+class AsyncConnectionPool:
+    def __init__(self, maxConnections=DEFAULT_POOL_SIZE, idleTimeout=DEFAULT_IDLE_TIMEOUT):
+        self.maxConnections = maxConnections
+        self.idleTimeout = idleTimeout
+        self.idle = {} # (host, port)-->[(reader, writer, lastUsed), ...], most recently used last
+        self.slots = {} # (host, port)-->semaphore bounding the connections in use
+
+    # POST a body on a pooled connection and return (status, body, response headers)
+    async def post(self, url, body, contentType='application/json', timeout=None):
+        host, port, path = splitUrl(url)
+        # The timeout covers waiting for a free connection as well as the exchange itself
+        return await asyncio.wait_for(self.exchange((host, port), path, body, contentType), timeout)
+
+    async def exchange(self, key, path, body, contentType):
+        async with self.slots.setdefault(key, asyncio.Semaphore(self.maxConnections)):
+            connection = self.takeIdle(key)
+            if connection is not None:
+                try:
+                    return await self.roundTrip(key, connection, path, body, contentType)
+                except (ConnectionError, asyncio.IncompleteReadError):
+                    pass # the server dropped the idle connection, retry once on a fresh one
+            connection = await openConnection(*key)
+            return await self.roundTrip(key, connection, path, body, contentType)
+
+    async def roundTrip(self, key, connection, path, body, contentType):
+        reader, writer = connection
+        try:
+            writer.write(encodeRequest('POST', key[0], key[1], path, body, contentType))
+            await writer.drain()
+            status, headers, responseBody = await readResponse(reader)
+        except BaseException:
+            writer.close()
+            raise
+        if headers.get('connection', '').lower() == 'close':
+            writer.close()
+        else:
+            self.idle.setdefault(key, []).append((reader, writer, time.monotonic()))
+        return status, responseBody, headers
+
+    def takeIdle(self, key):
+        self.evictIdle()
+        connections = self.idle.get(key)
+        while connections:
+            reader, writer, _ = connections.pop()
+            if not reader.at_eof() and not writer.is_closing():
+                return reader, writer
+            writer.close()
+        return None
+
+    def evictIdle(self):
+        deadline = time.monotonic() - self.idleTimeout
+        for connections in self.idle.values():
+            while connections and connections[0][2] < deadline:
+                connections.pop(0)[1].close()
+
+    def close(self):
+        for connections in self.idle.values():
+            for _, writer, _ in connections: writer.close()
+        self.idle.clear()
@@ -0,0 +1,72 @@
+# Load time and peak RSS of an architecture file of a generated model: the streaming JSON Lines
+# loader against reading the same records as one JSON document. Each load runs in a fresh
+# process so its peak RSS is its own; with --trace the peak of Python allocations is reported
+# too (tracemalloc slows loading down several times, times are not comparable then).
+# Run from the repository root: python -m Benchmarks.ArchitectureLoad
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+from ArchitectureLoader import saveArchitecture, writeArchitecture
+from SyntheticArchitecture import generateArchitecture
+
+# Peak RSS comes from VmHWM: ru_maxrss of a forked child starts from the peak of its parent
+LOAD = """
+import json, resource, sys, time, tracemalloc
+from ArchitectureLoader import loadArchitecture, addRecord
+from DeployerD import ArchitectureGenerator
+def peakRss():
+    try:
+        with open('/proc/self/status') as status:
+            return next(int(line.split()[1]) for line in status if line.startswith('VmHWM:')) * 1024
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+baseline = peakRss()
+trace = sys.argv[3] == 'trace'
+if trace: tracemalloc.start()
+start = time.perf_counter()
+if sys.argv[1] == 'stream':
+    generator, dynamic = loadArchitecture(sys.argv[2])
+else:
+    generator, dynamic = ArchitectureGenerator(), {}
+    with open(sys.argv[2], encoding='utf-8') as document:
+        for record in json.load(document): addRecord(generator, dynamic, record)
+elapsed = time.perf_counter() - start
+print(json.dumps({'seconds': elapsed, 'tracedPeak': tracemalloc.get_traced_memory()[1] if trace else None,
+                  'rssPeak': peakRss(), 'rssBaseline': baseline,
+                  'components': len(generator.components)}))
+"""
+
+def load(mode, path, trace):
+    output = subprocess.run([sys.executable, '-c', LOAD, mode, path, 'trace' if trace else 'rss'], capture_output=True, text=True, check=True).stdout
+    return json.loads(output)
+
+def run(sizes, jointSetSize, trace):
+    print(f"{'components':>10} {'file (MB)':>10} {'loader':>9} {'time (s)':>9} {'peak RSS (MB)':>14} {'over start (MB)':>16}"
+          + (f" {'traced peak (MB)':>17}" if trace else ""))
+    with tempfile.TemporaryDirectory() as directory:
+        for components in sizes:
+            generator, _ = generateArchitecture(components, jointSetSize)
+            streamPath = os.path.join(directory, 'architecture.jsonl')
+            documentPath = os.path.join(directory, 'architecture.json')
+            saveArchitecture(generator, streamPath)
+            with open(documentPath, 'w', encoding='utf-8') as document:
+                json.dump([json.loads(line) for line in writeArchitecture(generator)], document)
+            del generator
+            size = os.path.getsize(streamPath) / 2**20
+            for mode, path in (('stream', streamPath), ('document', documentPath)):
+                result = load(mode, path, trace)
+                assert result['components'] == components
+                print(f"{components:>10} {size:>10.1f} {mode:>9} {result['seconds']:>9.2f} {result['rssPeak'] / 2**20:>14.1f} "
+                      f"{(result['rssPeak'] - result['rssBaseline']) / 2**20:>16.1f}"
+                      + (f" {result['tracedPeak'] / 2**20:>17.1f}" if trace else ""))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 100000, 1000000])
+    parser.add_argument('--joint-set-size', type=int, default=10)
+    parser.add_argument('--trace', action='store_true', help="also report the tracemalloc peak")
+    args = parser.parse_args()
+    run(args.sizes, args.joint_set_size, args.trace)
@@ -0,0 +1,58 @@
+# Payload bytes and deploy latency of Deployer.deploy on a generated architecture, with the full
+# \mu copied into every joint set (before) against the per-joint-set \mu slice (after).
+# Control managers are started as local subprocesses.
+# Run from the repository root: python -m Benchmarks.DeployPayload
+import argparse
+import json
+import subprocess
+import sys
+import time
+from DeployerD import Host, HierarchicalControl, Deployer
+from SyntheticArchitecture import generateArchitecture
+
+MANAGER = "import sys; from ControlManagerD import run_manager_server; run_manager_server('127.0.0.1', int(sys.argv[1]))"
+
+class FullMuDeployer(Deployer):
+    def buildPayload(self, manager, componentIndex):
+        payload = super().buildPayload(manager, componentIndex)
+        for value in payload['controls'].values(): value['mu'] = self.hierarchicalControl.architectureGenerator.mu
+        return payload
+
+def startManagers(ports):
+    managers = [subprocess.Popen([sys.executable, '-c', MANAGER, str(port)], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL) for port in ports]
+    time.sleep(1.0)
+    return managers
+
+def measure(deployerClass, controlStructure, ports):
+    deployer = deployerClass(controlStructure, [Host('http://127.0.0.1', port) for port in ports])
+    deployer.allocate()
+    componentIndex = list(controlStructure.architectureGenerator.components)
+    payloadBytes = sum(len(json.dumps(deployer.buildPayload(manager, componentIndex))) for manager in deployer.controlManagers)
+    managers = startManagers(ports)
+    try:
+        start = time.perf_counter()
+        results = deployer.deploy()
+        elapsed = time.perf_counter() - start
+    finally:
+        for manager in managers: manager.terminate()
+    failures = [str(result) for result in results.values() if not result.succeeded()]
+    return payloadBytes, elapsed, failures
+
+def run(components, jointSetSize, managerCount, basePort):
+    generator, dynamic = generateArchitecture(components, jointSetSize)
+    controlStructure = HierarchicalControl(generator, dynamic)
+    ports = [basePort + 10 * i for i in range(managerCount)]
+    print(f"{components} components, {len(generator.jointSets)} joint sets, {managerCount} managers")
+    print(f"{'payload':>8} {'bytes':>14} {'deploy (s)':>11}")
+    for name, deployerClass in (('full mu', FullMuDeployer), ('mu slice', Deployer)):
+        payloadBytes, elapsed, failures = measure(deployerClass, controlStructure, ports)
+        print(f"{name:>8} {payloadBytes:>14,} {elapsed:>11.3f}" + (f"  FAILED: {failures}" if failures else ""))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--components', type=int, default=10000)
+    parser.add_argument('--joint-set-size', type=int, default=20)
+    parser.add_argument('--managers', type=int, default=2)
+    parser.add_argument('--base-port', type=int, default=18080)
+    args = parser.parse_args()
+    run(args.components, args.joint_set_size, args.managers, args.base_port)
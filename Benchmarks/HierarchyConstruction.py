@@ -0,0 +1,52 @@
+# HierarchicalControl construction time on synthetic architectures: the original nested loops
+# (O(J*C) masters, O(J^2) slaves) against the single pass over \mu with an inverted index (O(C + E)).
+# Run from the repository root: python -m Benchmarks.HierarchyConstruction
+import argparse
+import time
+from DeployerD import HierarchicalControl
+from SyntheticArchitecture import generateArchitecture
+
+# Construction as it was before the inverted index, for comparison
+class NestedLoopHierarchicalControl(HierarchicalControl):
+    def createMasters(self):
+        masters = {}
+        for jointSetId, value in self.architectureGenerator.jointSets.items():
+            m = set()
+            for componentId, jointSetId2 in self.architectureGenerator.mu.items():
+                if(jointSetId == jointSetId2): m.add(self.dynamic[componentId])
+            masters[jointSetId] = m
+        return masters
+
+    def createSlaves(self):
+        slaves = {}
+        for jointSetId, value in self.architectureGenerator.jointSets.items():
+            s = []
+            for jointSetId2, mastersL in self.masters.items():
+                if jointSetId in mastersL: s.append(jointSetId2)
+            slaves[jointSetId] = s
+        return slaves
+
+def timeConstruction(controlClass, generator, dynamic):
+    start = time.perf_counter()
+    controlStructure = controlClass(generator, dynamic)
+    return time.perf_counter() - start, controlStructure
+
+def run(sizes, jointSetSize, nestedLimit):
+    print(f"{'components':>10} {'joint sets':>10} {'nested (s)':>11} {'indexed (s)':>12}")
+    for components in sizes:
+        generator, dynamic = generateArchitecture(components, jointSetSize)
+        indexed, controlStructure = timeConstruction(HierarchicalControl, generator, dynamic)
+        nested = "skipped"
+        if components <= nestedLimit:
+            seconds, reference = timeConstruction(NestedLoopHierarchicalControl, generator, dynamic)
+            assert reference.masters == controlStructure.masters and reference.slaves == controlStructure.slaves
+            nested = f"{seconds:.3f}"
+        print(f"{components:>10} {len(generator.jointSets):>10} {nested:>11} {indexed:>12.3f}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 30000, 100000])
+    parser.add_argument('--joint-set-size', type=int, default=10)
+    parser.add_argument('--nested-limit', type=int, default=30000, help="largest size timed with the nested loops")
+    args = parser.parse_args()
+    run(args.sizes, args.joint_set_size, args.nested_limit)
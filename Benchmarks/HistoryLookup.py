@@ -0,0 +1,74 @@
+# Round cost and memory of the weight history used by chooseOptimalArchitecture, against history length.
+# "before" is the original per-component list of (weight, timestamp) tuples with a linear scan,
+# "after" is the per-control WeightHistory (shared timestamp column + weights matrix) with one binary search.
+# Run from the repository root: python -m Benchmarks.HistoryLookup
+import argparse
+import random
+import time
+import tracemalloc
+from WeightHistory import WeightHistory
+
+def linearNearest(componentWeights, initiatorTimestamp):
+    chosenTimestamp = float('inf')
+    for weightTimestamp in componentWeights:
+        delta = abs(weightTimestamp[1] - initiatorTimestamp)
+        if delta <= chosenTimestamp:
+            chosenTimestamp = delta
+            chosenWeight = weightTimestamp[0]
+    return chosenWeight
+
+def roundBefore(componentWeightsMap, initiatorTimestamp):
+    for componentWeights in componentWeightsMap.values():
+        linearNearest(componentWeights, initiatorTimestamp)
+
+def roundAfter(weightHistory, initiatorTimestamp):
+    chosenWeights = weightHistory.nearest(initiatorTimestamp)[0]
+    for column in range(weightHistory.width):
+        float(chosenWeights[column])
+
+def timeRound(history, round, initiatorTimestamps):
+    start = time.perf_counter()
+    for initiatorTimestamp in initiatorTimestamps: round(history, initiatorTimestamp)
+    return (time.perf_counter() - start) / len(initiatorTimestamps)
+
+def measured(build):
+    tracemalloc.start()
+    history = build()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return history, size
+
+def run(components, historyLengths, rounds, seed):
+    rng = random.Random(seed)
+    names = [f"C{i}" for i in range(components)]
+    print(f"{'history':>8} {'before (ms)':>12} {'after (ms)':>12} {'speedup':>8} {'before (MB)':>12} {'after (MB)':>11}")
+    for historyLength in historyLengths:
+        ticks = [(2.0 * tick, [rng.random() for _ in names]) for tick in range(historyLength)]
+
+        def buildBefore():
+            componentWeightsMap = {name: [] for name in names}
+            for timestamp, weights in ticks:
+                for name, weight in zip(names, weights): componentWeightsMap[name].append((weight, timestamp))
+            return componentWeightsMap
+
+        def buildAfter():
+            weightHistory = WeightHistory(names, historyLength)
+            for timestamp, weights in ticks: weightHistory.append(timestamp, weights)
+            return weightHistory
+
+        before, beforeBytes = measured(buildBefore)
+        after, afterBytes = measured(buildAfter)
+        initiatorTimestamps = [rng.uniform(0.0, 2.0 * historyLength) for _ in range(rounds)]
+        beforeTime = timeRound(before, roundBefore, initiatorTimestamps)
+        afterTime = timeRound(after, roundAfter, initiatorTimestamps)
+        print(f"{historyLength:>8} {beforeTime * 1e3:>12.3f} {afterTime * 1e3:>12.3f} {beforeTime / afterTime:>7.1f}x"
+              f" {beforeBytes / 2**20:>12.2f} {afterBytes / 2**20:>11.2f}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--components', type=int, default=200)
+    parser.add_argument('--history', type=int, nargs='+', default=[10, 100, 1000, 10000])
+    parser.add_argument('--rounds', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+    run(args.components, args.history, args.rounds, args.seed)
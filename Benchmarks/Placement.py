@@ -0,0 +1,36 @@
+# Placement strategies on synthetic architectures: master/slave edges cut between control managers
+# and imbalance of the estimated load (see Placement.estimateLoad), the heaviest manager over the mean.
+# Run from the repository root: python -m Benchmarks.Placement
+import argparse
+import random
+import time
+from DeployerD import HierarchicalControl, Deployer, Host
+from Placement import hostLoads, edgeCut
+from SyntheticArchitecture import generateArchitecture
+
+def place(controlStructure, hosts, strategy):
+    deployer = Deployer(controlStructure, hosts)
+    start = time.perf_counter()
+    deployer.allocate(strategy)
+    elapsed = time.perf_counter() - start
+    loads = hostLoads(controlStructure, deployer.controlHosts, hosts)
+    return elapsed, edgeCut(controlStructure, deployer.controlHosts), max(loads) / (sum(loads) / len(loads))
+
+def run(sizes, managers, jointSetSize):
+    random.seed(0)
+    hosts = [Host(f"http://10.0.0.{i + 1}", 8080) for i in range(managers)]
+    print(f"{'components':>10} {'edges':>8} {'strategy':>12} {'edge cut':>9} {'imbalance':>10} {'time (s)':>9}")
+    for components in sizes:
+        controlStructure = HierarchicalControl(*generateArchitecture(components, jointSetSize))
+        edges = sum(len(mastersL) for mastersL in controlStructure.masters.values())
+        for strategy in ('random', 'balanced', 'partitioned'):
+            elapsed, cut, imbalance = place(controlStructure, hosts, strategy)
+            print(f"{components:>10} {edges:>8} {strategy:>12} {cut:>9} {imbalance:>10.3f} {elapsed:>9.3f}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000])
+    parser.add_argument('--managers', type=int, default=8)
+    parser.add_argument('--joint-set-size', type=int, default=10)
+    args = parser.parse_args()
+    run(args.sizes, args.managers, args.joint_set_size)
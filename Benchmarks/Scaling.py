@@ -0,0 +1,100 @@
+# Scaling suite on synthetic architectures: HierarchicalControl construction, Deployer.allocate,
+# payload building (as in Deployer.deploy, JSON encoding included) and one aggregation round run
+# locally, from every initiator to the enders, on Control objects created from the payloads.
+# Results go to a JSON file, one entry per configuration.
+# Run from the repository root: python -m Benchmarks.Scaling --output scaling.json
+import argparse
+import contextlib
+import io
+import json
+import platform
+import random
+import time
+from collections import deque
+from ControlManagerD import ControlManager
+from DeployerD import HierarchicalControl, Deployer, Host
+from SyntheticArchitecture import generateArchitecture, SIZE_DISTRIBUTIONS
+
+def timed(function, *args):
+    start = time.perf_counter()
+    result = function(*args)
+    return time.perf_counter() - start, result
+
+def buildPayloads(deployer):
+    componentIndex = deployer.componentIndex()
+    return [json.dumps(deployer.buildPayload(manager, componentIndex)) for manager in deployer.controlManagers]
+
+def createControls(payloads):
+    manager = ControlManager('127.0.0.1', None)
+    controls = {}
+    for payload in payloads:
+        for jointSetId, value in json.loads(payload)['controls'].items():
+            controls[jointSetId] = manager.createControl(jointSetId, value)
+    for control in controls.values(): control.updateWeights()
+    return controls
+
+# Messages go straight from each control to its masters, as between controls of one manager.
+# Returns the number of enders that decided the round
+def aggregationRound(controls):
+    messages = deque((control, control.initiateAggregation()) for control in controls.values() if control.isInitiator())
+    decided = 0
+    while messages:
+        control, message = messages.popleft()
+        for masterID in control.masters:
+            master = controls[masterID]
+            response = master.receiveFromSlave(message)
+            if response is not None:
+                messages.append((master, response))
+            elif master.isEnder() and master.barrier.inFlight() == 0:
+                decided += 1
+    return decided
+
+def measure(components, jointSetSize, tupleSize, sizeDistribution, depth, fanIn, managers, strategy, seed):
+    generator, dynamic = generateArchitecture(components, jointSetSize, tupleSize, seed, sizeDistribution=sizeDistribution, depth=depth, fanIn=fanIn)
+    construction, controlStructure = timed(HierarchicalControl, generator, dynamic)
+    deployer = Deployer(controlStructure, [Host(f"http://10.0.0.{i + 1}", 8080) for i in range(managers)])
+    random.seed(seed)
+    allocation, _ = timed(deployer.allocate, strategy)
+    payloadTime, payloads = timed(buildPayloads, deployer)
+    with contextlib.redirect_stdout(io.StringIO()): # controls print every decision
+        creation, controls = timed(createControls, payloads)
+        roundTime, decided = timed(aggregationRound, controls)
+    return {'components': components, 'jointSets': len(generator.jointSets), 'jointSetSize': jointSetSize, 'tupleSize': tupleSize,
+            'sizeDistribution': sizeDistribution, 'depth': depth, 'fanIn': fanIn, 'managers': managers, 'strategy': strategy, 'seed': seed,
+            'edges': sum(len(mastersL) for mastersL in controlStructure.masters.values()), 'criticalPathLength': controlStructure.criticalPathLength,
+            'initiators': sum(control.isInitiator() for control in controls.values()),
+            'enders': sum(control.isEnder() for control in controls.values()), 'endersDecided': decided,
+            'payloadBytes': sum(len(payload) for payload in payloads),
+            'seconds': {'construction': construction, 'allocate': allocation, 'payloads': payloadTime,
+                        'controlCreation': creation, 'aggregationRound': roundTime}}
+
+def run(args):
+    results = []
+    print(f"{'components':>10} {'depth':>5} {'fanIn':>5} {'construct':>10} {'allocate':>9} {'payloads':>9} {'round':>8} (s)")
+    for components in args.sizes:
+        for depth in args.depths:
+            result = measure(components, args.joint_set_size, args.tuple_size, args.size_distribution, depth, args.fan_in,
+                             args.managers, args.strategy, args.seed)
+            results.append(result)
+            seconds = result['seconds']
+            print(f"{components:>10} {str(depth):>5} {args.fan_in:>5} {seconds['construction']:>10.3f} {seconds['allocate']:>9.3f} "
+                  f"{seconds['payloads']:>9.3f} {seconds['aggregationRound']:>8.3f}")
+    report = {'python': platform.python_version(), 'machine': platform.machine(), 'results': results}
+    with open(args.output, 'w', encoding='utf-8') as output:
+        json.dump(report, output, indent=2)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000])
+    parser.add_argument('--joint-set-size', type=int, default=10)
+    parser.add_argument('--tuple-size', type=int, default=2)
+    parser.add_argument('--size-distribution', choices=SIZE_DISTRIBUTIONS, default='fixed')
+    parser.add_argument('--depths', type=lambda value: None if value == 'window' else int(value), nargs='+', default=[None, 4],
+                        help="hierarchy depths, 'window' for the default chain-like hierarchy")
+    parser.add_argument('--fan-in', type=int, default=3)
+    parser.add_argument('--managers', type=int, default=8)
+    parser.add_argument('--strategy', choices=('random', 'balanced', 'partitioned'), default='random')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', default='scaling.json')
+    args = parser.parse_args()
+    run(args)
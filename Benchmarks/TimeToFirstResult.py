@@ -0,0 +1,93 @@
+# Time from the start of Deployer.deploy to the first optimal architecture decided by an ender,
+# with the readiness barrier (initiators held until one start signal) against initiators that
+# fire as soon as they are deployed. Control managers run as local subprocesses; messages that
+# reached a manager before their control existed (404) are counted as lost.
+# Run from the repository root: python -m Benchmarks.TimeToFirstResult
+import argparse
+import random
+import subprocess
+import sys
+import threading
+import time
+from DeployerD import Host, HierarchicalControl, Deployer
+from SyntheticArchitecture import generateArchitecture
+
+MANAGER = ("import asyncio, sys; from ControlManagerD import ControlManager; "
+           "asyncio.run(ControlManager('127.0.0.1', int(sys.argv[1]), aggregationInterval=float(sys.argv[2])).serve())")
+
+# Deploys the way it was done before level ordering and the readiness barrier: one request per
+# manager, and initiators start firing on arrival
+class NoHoldDeployer(Deployer):
+    def deployPayloads(self, payloads, timeout, maxWorkers, start):
+        return self.deployWave({manager: dict(payload, hold=False) for manager, payload in payloads.items()}, timeout, maxWorkers)
+
+class ManagerOutput:
+    def __init__(self, ports, interval):
+        self.processes = [subprocess.Popen([sys.executable, '-u', '-c', MANAGER, str(port), str(interval)], stdout=subprocess.PIPE,
+                                           stderr=subprocess.DEVNULL, text=True) for port in ports]
+        self.firstResult = None
+        self.results = 0
+        self.lost = 0
+        self.lock = threading.Lock()
+        self.readers = [threading.Thread(target=self.read, args=(process,), daemon=True) for process in self.processes]
+        for reader in self.readers: reader.start()
+
+    def read(self, process):
+        for line in process.stdout:
+            with self.lock:
+                if line.startswith("OPTIMAL ARCHITECTURE"):
+                    self.results += 1
+                    if self.firstResult is None: self.firstResult = time.perf_counter()
+                elif "failed with code 404" in line:
+                    self.lost += 1
+
+    def stop(self):
+        for process in self.processes: process.terminate()
+        for process in self.processes: process.wait()
+
+def measure(deployerClass, controlStructure, ports, interval, duration, strategy, settings):
+    managers = ManagerOutput(ports, interval)
+    time.sleep(1.0)
+    deployer = deployerClass(controlStructure, [Host('http://127.0.0.1', port) for port in ports])
+    deployer.configure(**settings)
+    random.seed(0)
+    deployer.allocate(strategy)
+    try:
+        start = time.perf_counter()
+        results = deployer.deploy(start=deployerClass is not NoHoldDeployer)
+        deployed = time.perf_counter() - start
+        time.sleep(duration)
+    finally:
+        managers.stop()
+    failures = [str(result) for result in results.values() if not result.succeeded()]
+    firstResult = None if managers.firstResult is None else managers.firstResult - start
+    return deployed, firstResult, managers.results, managers.lost, failures
+
+def run(components, depth, fanIn, managerCount, interval, duration, basePort, strategy, settings):
+    controlStructure = HierarchicalControl(*generateArchitecture(components, depth=depth, fanIn=fanIn))
+    print(f"{components} components, {len(controlStructure.masters)} joint sets, critical path {controlStructure.criticalPathLength}, "
+          f"{managerCount} managers ({strategy} placement), a round every {interval} s")
+    print(f"{'deployment':>12} {'deploy (s)':>11} {'first result (s)':>17} {'results':>8} {'lost':>6}")
+    for name, deployerClass in (('no barrier', NoHoldDeployer), ('barrier', Deployer)):
+        ports = [basePort + i for i in range(managerCount)]
+        deployed, firstResult, results, lost, failures = measure(deployerClass, controlStructure, ports, interval, duration, strategy, settings)
+        first = "none" if firstResult is None else f"{firstResult:.3f}"
+        print(f"{name:>12} {deployed:>11.3f} {first:>17} {results:>8} {lost:>6}")
+        for failure in failures: print(f"  {failure}")
+        basePort += managerCount # fresh ports, the previous managers may still hold theirs
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--components', type=int, default=20000)
+    parser.add_argument('--depth', type=int, default=6)
+    parser.add_argument('--fan-in', type=int, default=3)
+    parser.add_argument('--managers', type=int, default=4)
+    parser.add_argument('--interval', type=float, default=1.0, help="seconds between aggregation rounds")
+    parser.add_argument('--duration', type=float, default=6.0, help="seconds the managers run after the deployment")
+    parser.add_argument('--base-port', type=int, default=8400)
+    parser.add_argument('--strategy', choices=('random', 'balanced', 'partitioned'), default='random')
+    parser.add_argument('--quorum', type=int, help="slaves enough for a master to decide a round")
+    parser.add_argument('--round-deadline', type=float, help="seconds after which a master decides a round with the slaves it has")
+    args = parser.parse_args()
+    run(args.components, args.depth, args.fan_in, args.managers, args.interval, args.duration, args.base_port, args.strategy,
+        {'quorum': args.quorum, 'roundDeadline': args.round_deadline})
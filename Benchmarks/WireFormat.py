@@ -0,0 +1,35 @@
+# Encode/decode cost and bytes per slave-to-master message, JSON against the binary wire format,
+# for growing architecture lists (the list grows by one component at every level of the hierarchy).
+# Run from the repository root: python -m Benchmarks.WireFormat
+import argparse
+import time
+from WireFormat import WireCodec, encodeJson, decodeJson
+
+def timePerCall(function, argument, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat): function(argument)
+    return (time.perf_counter() - start) / repeat
+
+def run(components, lengths, repeat):
+    codec = WireCodec([f"C{i}" for i in range(components)])
+    print(f"{'length':>7} {'json B':>8} {'binary B':>9} {'json enc us':>12} {'bin enc us':>11} {'json dec us':>12} {'bin dec us':>11}")
+    for length in lengths:
+        message = {'slaveID': 'O42',
+                   'slaveArchitecture': [f"C{(i * 7919) % components}" for i in range(length)],
+                   'slaveWeight': 3.141592653589793,
+                   'initiatorTimestamp': 1792328291.117438,
+                   'roundID': 1234,
+                   'partial': False}
+        jsonBody, binaryBody = encodeJson(message), codec.encode(message)
+        assert codec.decode(binaryBody) == message
+        print(f"{length:>7} {len(jsonBody):>8} {len(binaryBody):>9}"
+              f" {timePerCall(encodeJson, message, repeat) * 1e6:>12.2f} {timePerCall(codec.encode, message, repeat) * 1e6:>11.2f}"
+              f" {timePerCall(decodeJson, jsonBody, repeat) * 1e6:>12.2f} {timePerCall(codec.decode, binaryBody, repeat) * 1e6:>11.2f}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--components', type=int, default=100000)
+    parser.add_argument('--lengths', type=int, nargs='+', default=[1, 10, 100, 1000])
+    parser.add_argument('--repeat', type=int, default=2000)
+    args = parser.parse_args()
+    run(args.components, args.lengths, args.repeat)
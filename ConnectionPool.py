@@ -0,0 +1,81 @@
+import http.client
+import socket
+import threading
+import time
+from AsyncHttp import splitUrl, DEFAULT_POOL_SIZE, DEFAULT_IDLE_TIMEOUT
+
+# http.client connection over a Unix domain socket, for 'unix://' addresses
+class UnixHTTPConnection(http.client.HTTPConnection):
+    def __init__(self, socketPath, timeout=None):
+        super().__init__('localhost', timeout=timeout)
+        self.socketPath = socketPath
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(self.socketPath)
+
+# Thread-safe pool of keep-alive http.client connections used by the deployer, at most
+# maxConnections per (host, port); connections left idle for more than idleTimeout seconds are closed
+class HttpConnectionPool:
+    def __init__(self, maxConnections=DEFAULT_POOL_SIZE, idleTimeout=DEFAULT_IDLE_TIMEOUT, timeout=None):
+        self.maxConnections = maxConnections
+        self.idleTimeout = idleTimeout
+        self.timeout = timeout # default socket timeout in seconds
+        self.lock = threading.Lock()
+        self.idle = {} # (host, port)-->[(connection, lastUsed), ...], most recently used last
+        self.slots = {} # (host, port)-->semaphore bounding the connections in use
+
+    # POST a body on a pooled connection and return (status, body)
+    def post(self, url, body, contentType='application/json', timeout=None):
+        host, port, path = splitUrl(url)
+        key = (host, port)
+        timeout = self.timeout if timeout is None else timeout
+        with self.lock:
+            slots = self.slots.setdefault(key, threading.BoundedSemaphore(self.maxConnections))
+        with slots:
+            connection = self.takeIdle(key)
+            if connection is not None:
+                try:
+                    return self.roundTrip(key, connection, path, body, contentType, timeout)
+                except (http.client.RemoteDisconnected, ConnectionError):
+                    pass # the server dropped the idle connection, retry once on a fresh one
+            connection = http.client.HTTPConnection(host, port, timeout=timeout) if port is not None else UnixHTTPConnection(host, timeout)
+            return self.roundTrip(key, connection, path, body, contentType, timeout)
+
+    def roundTrip(self, key, connection, path, body, contentType, timeout):
+        try:
+            if connection.sock is not None: connection.sock.settimeout(timeout)
+            connection.request('POST', path, body, {'Content-Type': contentType, 'Connection': 'keep-alive'})
+            response = connection.getresponse()
+            responseBody = response.read()
+        except BaseException:
+            connection.close()
+            raise
+        if response.will_close:
+            connection.close()
+        else:
+            with self.lock:
+                self.idle.setdefault(key, []).append((connection, time.monotonic()))
+        return response.status, responseBody
+
+    def takeIdle(self, key):
+        self.evictIdle()
+        with self.lock:
+            connections = self.idle.get(key)
+            if connections:
+                return connections.pop()[0]
+        return None
+
+    def evictIdle(self):
+        deadline = time.monotonic() - self.idleTimeout
+        with self.lock:
+            for connections in self.idle.values():
+                while connections and connections[0][1] < deadline:
+                    connections.pop(0)[0].close()
+
+    def close(self):
+        with self.lock:
+            for connections in self.idle.values():
+                for connection, _ in connections: connection.close()
+            self.idle.clear()
@@ -1,10 +1,31 @@
-from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler, HTTPServer
+import asyncio
 import json
-import threading
-import time
-#import requests
+import math
+import os
 import random
+import time
 from datetime import datetime
+from functools import partial
+from AggregationBarrier import AggregationBarrier, ROUND_TIMEOUT
+from AsyncHttp import serveConnection, AsyncConnectionPool, DEFAULT_POOL_SIZE, DEFAULT_IDLE_TIMEOUT
+from WeightEngine import WeightEngine
+from WeightHistory import WeightHistory, DEFAULT_HISTORY_SIZE
+from WireFormat import (WireCodec, WireFormatError, encodeJson, decodeJson, encodeBatch, decodeBatch,
+                        JSON_CONTENT_TYPE, BINARY_CONTENT_TYPE, BATCH_CONTENT_TYPE, ACCEPTED_CONTENT_TYPES)
+
+UPDATE_INTERVAL = 2 # seconds between two weight updates of a control
+AGGREGATION_INTERVAL = 10 # seconds between two aggregation rounds fired by an initiator, may be below the round latency
+EXPIRY_INTERVAL = 0.25 # seconds between two sweeps for rounds past their deadline or timeout
+MISSING_LAST_KNOWN = 'lastKnown' # a partial round reuses the last known result of a missing slave...
+MISSING_EXCLUDE = 'exclude' # ...or leaves out the components mapped to it
+MASTER_TIMEOUT = 5.0 # seconds allowed to each master to acknowledge a message
+CONTROL_ROUTE = '/control/' # controls hosted by a manager are reached at <manager address>/control/<jointSetId>
+BATCH_ROUTE = '/batch' # coalesced messages for several controls of a manager
+RECONFIGURABLE = {'masters', 'slaves', 'mu'} # parts of a deployed control that change without restarting it
+# Optional parts of a control description, left out for the defaults
+CONTROL_SETTINGS = {'historySize', 'historyAge', 'roundTimeout', 'quorum', 'roundDeadline', 'missingSlavePolicy'}
+START_ROUTE = '/start' # start signal of the deployer, releases the initiators deployed on hold
+LISTEN_BACKLOG = 4096 # pending connections on the manager listener; on the start signal every initiator connects at once
 
 class Component:
     def __init__(self, name, featureTuple):
@@ -13,179 +34,534 @@ class Component:
         self.weight = 0.0
 
 class Control:
-    def __init__(self, id, masters, slaves, ip, port, components, tupleSize, mu):
+    def __init__(self, id, masters, slaves, ip, port, components, tupleSize, mu, historySize=DEFAULT_HISTORY_SIZE, historyAge=None,
+                 roundTimeout=ROUND_TIMEOUT, quorum=None, roundDeadline=None, missingSlavePolicy=MISSING_LAST_KNOWN):
         self.id = id
-        self.masters = masters # Example {'O3': '192.168.0.1',...}
-        self.slaves = slaves # Example {'O1': '192.168.0.3',...}
+        self.masters = masters # Example {'O3': 'http://192.168.0.1:8080/control/O3',...}
+        self.slaves = slaves # Example {'O1': 'http://192.168.0.3:8080/control/O1',...}
         self.ip = ip
-        self.port = port
+        self.port = port # None when the control is only reachable through the listener of its manager
         self.components = components
         self.tupleSize = tupleSize
         self.mu = mu # This is the \mu mapping from SAG (components to joint sets)
-    def isInitiator(self):        
+        self.historySize = historySize # Retention of the weight history, by number of samples...
+        self.historyAge = historyAge # ...and optionally by age in seconds
+        # Feature tuples of all components stored as one matrix
+        self.weightEngine = WeightEngine(components, tupleSize)
+        # Ring buffer of ticks: one timestamp plus the weights of every component per tick, oldest ticks are dropped
+        self.weightHistory = WeightHistory([component.name for component in components], historySize, historyAge)
+        # Last known result of each slave, of the form SlaveID-->(architectureList, weight, initiatorTimestamp)
+        self.slaveArchWeight = {}
+        # Synchronises all slaves of a round (or a quorum of them, or whoever reported by the deadline)
+        # before deciding the optimal architecture, and keeps the slave results of each round in flight
+        self.barrier = AggregationBarrier(slaves, roundTimeout, quorum=quorum, deadline=roundDeadline)
+        self.missingSlavePolicy = missingSlavePolicy
+        self.roundCount = 0 # rounds fired so far, when this control is an initiator
+    def isInitiator(self):
         return not bool(self.slaves)
+    # New neighbours and \mu from a redeployment; components, weights and history are kept
+    def reconfigure(self, masters, slaves, mu):
+        self.masters = masters
+        self.slaves = slaves
+        self.mu = mu
+        self.barrier.setSlaves(slaves)
+        for slaveID in set(self.slaveArchWeight).difference(slaves):
+            del self.slaveArchWeight[slaveID]
     def isEnder(self):
         return not bool(self.masters)
     def __str__(self):
         return f"{self.ip}:{self.port}"
 
-def run_control_server(id, port, isInitiator, isEnder, masters, slaves, tupleSize, components, mu):
-
-    class ControlServer(BaseHTTPRequestHandler):
-        count_slaves = 0
-        def do_POST(self): 
-            # Deserialise JSON message from deployer
-            content_len = int(self.headers.get('content-length', 0))
-            post_body = self.rfile.read(content_len)
-            post_body_str = post_body.decode('utf-8')
-            data = json.loads(post_body_str)   
-
-            # Aggregate weights from slave            
-            slaveArchWeight[data['slaveID']] = (data['slaveArchitecture'], data['slaveWeight'], data['initiatorTimestamp'])            
-                    
-            # Send a response back to the client
-            self.send_response(200)
-            self.send_header('Content-type', 'text/plain')
-            self.end_headers()
-
-            # Synchronises all slaves before deciding the optimal architecture
-            ControlServer.count_slaves += 1                  
-            
-            # Choose the optimal architecture only if received message from all slaves            
-            if ControlServer.count_slaves == len(slaves):
-                optimalArchitectureWeight = chooseOptimalArchitecture(data['initiatorTimestamp'])
-                print(f"{id}-->{optimalArchitectureWeight}")                
-                if not(isEnder): 
-                    sendToAllMasters(optimalArchitectureWeight[0], optimalArchitectureWeight[1], data['initiatorTimestamp'])
-                else:
-                    print(f"OPTIMAL ARCHITECTURE: {optimalArchitectureWeight[0]}")
-                    print(f"WEIGHT: {optimalArchitectureWeight[1]}")
-                    print(f"TIMESTAMP: {data['initiatorTimestamp']}")
-                ControlServer.count_slaves = 0
-    
-    def updateWeights():
-        while True:            
-            time.sleep(2)
-            environmentTuple = tuple(random.uniform(0.0, 1.0) for _ in range(tupleSize))
-            
-            # DOT Product (most optimisation problems are based on this)
-            for component in components:
-                sum = 0.0
-                for i in range(0, tupleSize):
-                    sum += environmentTuple[i]*component.featureTuple[i]
-                component.weight = sum
-                componentWeightsMap[component.name].append((component.weight, datetime.timestamp(datetime.now())))
-                #print (f"{id}-->{component.name}: {componentWeightsMap[component.name]}")                        
-
-    def initiateAggregation():
-        while True:            
-            time.sleep(10)
-            print(f"Control {id} has initiated aggregation")
-            timestamp = datetime.timestamp(datetime.now())
-
-            # Initiator just chooses component with minimal weight
-            optimalArchitectureList = []
-            optimalWeight = float('inf')            
-            for componentName, componentWeights in componentWeightsMap.items():                
-                if componentWeights[-1][0] <= optimalWeight: # compare the most recent weight for each component
-                    optimalWeight = componentWeights[-1][0]
-                    optimalArchitectureList = [componentName]                    
-                        
-            sendToAllMasters(optimalArchitectureList, optimalWeight, timestamp)                          
-
-    # Send the following to each master 
-    # (slaveID, architecture - chosen component, chosen component weight, timestamp)
-    def sendToAllMasters(optimalArchitectureList, optimalWeight, initiatorTimestamp):
+    def updateWeights(self):
+        environmentTuple = tuple(random.uniform(0.0, 1.0) for _ in range(self.tupleSize))
+        # DOT Product (most optimisation problems are based on this), all components at once
+        weights = self.weightEngine.computeWeights(environmentTuple)
+        # All components of a tick share the same environment sample, hence one timestamp
+        self.weightHistory.append(datetime.timestamp(datetime.now()), weights)
+
+    # Initiator just chooses component with minimal weight; no round is fired before the first weights exist.
+    # Rounds are numbered by the caller, or by the count of rounds fired so far
+    def initiateAggregation(self, roundID=None):
+        if not self.weightHistory:
+            return None
+        print(f"Control {self.id} has initiated aggregation")
+        timestamp = datetime.timestamp(datetime.now())
+        self.roundCount += 1
+        optimalArchitectureList = []
+        optimalWeight = float('inf')
+        latestWeights = self.weightHistory.latest()[0] # compare the most recent weight for each component
+        for column, componentName in enumerate(self.weightHistory.componentNames):
+            if latestWeights[column] <= optimalWeight:
+                optimalWeight = float(latestWeights[column])
+                optimalArchitectureList = [componentName]
+        return self.createMessage(optimalArchitectureList, optimalWeight, timestamp, self.roundCount if roundID is None else roundID)
+
+    # Aggregate weights from a slave, returns the message for the masters once the round is decided
+    def receiveFromSlave(self, data):
+        # Rounds are numbered by the initiators; older senders only carry the initiator timestamp
+        roundID = data.get('roundID', data['initiatorTimestamp'])
+        if data['slaveID'] not in self.barrier.slaveIDs:
+            print(f"{self.id}: ignoring message from unknown slave {data['slaveID']}")
+            return None
+        result = (data['slaveArchitecture'], data['slaveWeight'], data['initiatorTimestamp'])
+        self.slaveArchWeight[data['slaveID']] = result
+
+        # Choose the optimal architecture only if received message from all slaves (or a quorum) for this round
+        aggregationRound = self.barrier.arrive(roundID, data['slaveID'], result, data.get('partial', False))
+        if aggregationRound is None:
+            return None
+        return self.decideRound(aggregationRound)
+
+    # Rounds past their deadline are aggregated with the slaves that reported; without a deadline
+    # they are abandoned after the round timeout. Returns the messages for the masters
+    def expireRounds(self):
+        messages = []
+        for aggregationRound in self.barrier.expire():
+            if self.barrier.deadline is None:
+                print(f"{self.id}: round {aggregationRound.roundID} abandoned with {len(aggregationRound.slaveResults)}/{len(self.slaves)} slaves")
+                continue
+            message = self.decideRound(aggregationRound)
+            if message is not None: messages.append(message)
+        return messages
+
+    def decideRound(self, aggregationRound):
+        if not self.weightHistory:
+            # Started (or restarted by a redeployment) after the initiator, no weights of its own yet
+            print(f"{self.id}: round {aggregationRound.roundID} dropped, no weights yet")
+            return None
+        if not aggregationRound.slaveResults:
+            print(f"{self.id}: round {aggregationRound.roundID} dropped, no slave result left")
+            return None
+        slaveResults = aggregationRound.slaveResults
+        missingSlaves = self.barrier.missing(aggregationRound)
+        if missingSlaves and self.missingSlavePolicy == MISSING_LAST_KNOWN:
+            slaveResults = dict(slaveResults)
+            for slaveID in missingSlaves:
+                if slaveID in self.slaveArchWeight: slaveResults[slaveID] = self.slaveArchWeight[slaveID]
+        partial = aggregationRound.partial or bool(missingSlaves)
+        initiatorTimestamp = max(result[2] for result in aggregationRound.slaveResults.values())
+        optimalArchitectureWeight = self.chooseOptimalArchitecture(initiatorTimestamp, slaveResults)
+        if optimalArchitectureWeight is None:
+            print(f"{self.id}: round {aggregationRound.roundID} dropped, no component left without slaves {sorted(missingSlaves)}")
+            return None
+        print(f"{self.id}-->{optimalArchitectureWeight}")
+        if self.isEnder():
+            print(f"OPTIMAL ARCHITECTURE: {optimalArchitectureWeight[0]}")
+            print(f"WEIGHT: {optimalArchitectureWeight[1]}")
+            print(f"TIMESTAMP: {initiatorTimestamp}")
+            if partial: print(f"PARTIAL: missing slaves {sorted(missingSlaves)} at {self.id} or upstream")
+            return None
+        return self.createMessage(optimalArchitectureWeight[0], optimalArchitectureWeight[1], initiatorTimestamp, aggregationRound.roundID, partial)
+
+    # Message sent to each master
+    # (slaveID, architecture - chosen component, chosen component weight, timestamp, round, partial)
+    def createMessage(self, optimalArchitectureList, optimalWeight, initiatorTimestamp, roundID, partial=False):
         data = {}
-        data['slaveID'] = id
+        data['slaveID'] = self.id
         data['slaveArchitecture'] = optimalArchitectureList
         data['slaveWeight'] = optimalWeight
         data['initiatorTimestamp'] = initiatorTimestamp
+        data['roundID'] = roundID
+        data['partial'] = partial # True when a slave was missing here or upstream
+        return data
 
-        for masterID, masterIP in masters.items():            
-            try:            
-                response = requests.post(masterIP, json=data)            
-                if response.status_code == 200:
-                    print(response.text)
-                else:
-                    print(f"failed with code {response.status_code}")   
-            except response.exception.requestException as e:
-                print(f"An error occured: {e}") 
-
-    def chooseOptimalArchitecture(initiatorTimestamp): # Optimal means minimum                
-        optimalComponent = ""
+    # Components mapped to a slave without a result are left out; None if no component is left
+    def chooseOptimalArchitecture(self, initiatorTimestamp, slaveResults): # Optimal means minimum
+        optimalComponent = None
         optimalWeight = float('inf')
-        for componentName, componentWeights in componentWeightsMap.items():
-            
-            # For each component, choose the weight generated at 'the time' of the initiator
-            chosenTimestamp = float('inf')
-            for weightTimestamp in componentWeights:                
-                delta = abs(weightTimestamp[1] - initiatorTimestamp)
-                if delta <= chosenTimestamp:
-                    chosenTimestamp = delta
-                    chosenWeight = weightTimestamp[0]                
-
-            # Next, choose the best architecture  
-            aggregatedWeight = slaveArchWeight[mu[componentName]][1] + chosenWeight 
+        # Choose the weights generated at 'the time' of the initiator, one search for all components
+        chosenWeights = self.weightHistory.nearest(initiatorTimestamp)[0]
+        for column, componentName in enumerate(self.weightHistory.componentNames):
+            if self.mu[componentName] not in slaveResults:
+                continue
+
+            # Next, choose the best architecture
+            aggregatedWeight = slaveResults[self.mu[componentName]][1] + float(chosenWeights[column])
 
             if aggregatedWeight <= optimalWeight:
                 optimalWeight = aggregatedWeight
                 optimalComponent = componentName
-                
-        return (slaveArchWeight[mu[optimalComponent]][0] + [optimalComponent], optimalWeight)    
-    
-    # Each mapping has the form componentName-->[(weight1, timestamp1), (weight2, timestamp2), ...] 
-    componentWeightsMap = {}   
-    for component in components: componentWeightsMap[component.name] = []
-    # Each mapping has the form SlaveID-->(architectureList, weight, initiatorTimestamp)
-    slaveArchWeight = {} 
-
-    updateThread = threading.Thread(target=updateWeights)
-    updateThread.start()
-    if isInitiator:
-        aggregationThread = threading.Thread(target=initiateAggregation)
-        aggregationThread.start()
-
-    server_address = ('', port)
-    new_server = ThreadingHTTPServer(server_address, ControlServer)
-    print(f"Control {id} started on port {port}")
-    new_server.serve_forever()
-
-class ControlManager(BaseHTTPRequestHandler):   
-    def do_POST(self):
+
+        if optimalComponent is None:
+            return None
+        return (slaveResults[self.mu[optimalComponent]][0] + [optimalComponent], optimalWeight)
+
+# Runs every control deployed on this manager on one asyncio event loop. All controls share the
+# listener of the manager, which routes by path and can be TCP, a Unix domain socket (for
+# controls in other processes on the same machine) or both; a control deployed with an explicit
+# 'port' also gets a listener of its own. Periodic work runs as coroutines instead of threads.
+class ControlManager:
+    def __init__(self, ip, port, poolSize=DEFAULT_POOL_SIZE, poolIdleTimeout=DEFAULT_IDLE_TIMEOUT, masterTimeout=MASTER_TIMEOUT,
+                 aggregationInterval=AGGREGATION_INTERVAL, unixPath=None, preferBinary=False, flushWindow=None):
+        self.ip = ip
+        self.port = port # None to listen on the Unix socket only
+        self.unixPath = unixPath
+        self.preferBinary = preferBinary # send the binary wire format to masters that accept it
+        self.wireCodec = None # built from the component index of the last deployment
+        self.binaryMasters = set() # master addresses that advertised the binary format...
+        self.binaryRefused = set() # ...and those that rejected a binary message, which get JSON from then on
+        self.flushWindow = flushWindow # seconds messages to the same manager are held to leave together, None to send at once
+        self.outbox = {} # manager address-->[(masterID, masterIP, message, encoded, result), ...] waiting for the flush
+        self.batchRefused = set() # manager addresses that do not take batches
+        self.batchPool = AsyncConnectionPool(poolSize, poolIdleTimeout) # connections to the other managers, for batches
+        self.masterTimeout = masterTimeout
+        self.aggregationInterval = aggregationInterval
+        self.poolSize = poolSize # keep-alive connections per master of each control...
+        self.poolIdleTimeout = poolIdleTimeout # ...closed after this many idle seconds
+        self.controls = {} # jointSetId-->Control
+        self.specs = {} # jointSetId-->deployed description of the control, to tell what a redeployment changes
+        self.servers = {} # jointSetId-->dedicated listening server of the control, if any
+        self.tasks = {} # jointSetId-->periodic tasks of the control
+        self.pools = {} # jointSetId-->connections of the control to its masters
+        self.background = set() # fire-and-forget tasks, referenced until they finish
+        self.held = set() # initiators deployed on hold, waiting for the start signal to fire rounds
+        # Phase of the round grid, shared by all managers (the deployer sends its epoch with the start signal):
+        # round k is fired at roundPhase + k * aggregationInterval on the wall clock by every initiator,
+        # whenever it was (re)started. Round IDs count from the Unix epoch, so a new deployer can only
+        # shift them by less than a round, never send them back to 1
+        self.roundPhase = 0.0
+        self.localQueue = asyncio.Queue() # (masterID, message) sent between controls hosted here, never encoded
+
+    # Single entry point of the manager listener: deployments on '/', slave messages on /control/<jointSetId>.
+    # A deployment starts the controls it lists, reconfigures those already running here and stops
+    # the ones listed under 'remove'. With 'hold', initiators listen but fire no round before the
+    # start signal; the response tells the deployer that every control of the deployment is listening
+    async def handleManagerRequest(self, request):
+        if request.method != 'POST':
+            return (405, b'')
+        if request.path.startswith(CONTROL_ROUTE):
+            control = self.controls.get(request.path[len(CONTROL_ROUTE):])
+            if control is None:
+                return (404, b'')
+            return await self.handleControlRequest(control, request)
+        if request.path == BATCH_ROUTE:
+            return await self.handleBatchRequest(request)
+        if request.path == START_ROUTE:
+            return self.handleStartRequest(request)
+        if request.path not in ('/', '/deploy'):
+            return (404, b'')
         # Deserialise JSON message from deployer
-        content_len = int(self.headers.get('content-length', 0))
-        post_body = self.rfile.read(content_len)
-        post_body_str = post_body.decode('utf-8')
-        data = json.loads(post_body_str)
-
-        # Start control server
-        for key, value in data.items():                               
-            components = []
-            tupleSize = 0
-            for componentID, featureTuple in value['components'].items(): 
-                components.append(Component(componentID, featureTuple))
-                tupleSize = len(featureTuple)
-
-            control = Control(key, value['masters'], value['slaves'], self.server.server_address[0], value['port'], components, 
-                              tupleSize, value['mu'])              
-            t2 = threading.Thread(target=run_control_server, args=(control.id, control.port, control.isInitiator(), control.isEnder(), control.masters, control.slaves, control.tupleSize, control.components, control.mu))
-            t2.daemon = True  # daemon thread so it won't block program exit
-            t2.start()                    
-                
-        # Send a response back to the client
-        self.send_response(200)
-        self.send_header('Content-type', 'text/plain')
-        self.end_headers()
-
-def run_manager_server(ip, port):
-    server_address = (ip, port)
-    httpd = HTTPServer(server_address, ControlManager)
-    print('Control Manager Server listening on ' + ip + ":" + str(port))
-    httpd.serve_forever()
+        data = json.loads(request.body.decode('utf-8'))
+        # Deployers send {'componentIndex': [...], 'controls': {jointSetId: ...}}, older ones just the controls
+        if 'componentIndex' in data:
+            wireCodec = WireCodec(data['componentIndex'])
+            if self.wireCodec is None or wireCodec.fingerprint != self.wireCodec.fingerprint:
+                # Masters that refused binary did so against the old index, they get another try with the new one
+                self.binaryMasters.clear()
+                self.binaryRefused.clear()
+            self.wireCodec = wireCodec
+        controls = data['controls'] if 'controls' in data else data
+        hold = data.get('hold', False) if 'controls' in data else False
+        for key in data.get('remove', []) if 'controls' in data else []:
+            await self.stopControl(key)
+
+        # Start control servers
+        for key, value in controls.items():
+            if key in self.controls:
+                await self.reconfigureControl(self.controls[key], value, hold)
+            else:
+                await self.startControl(self.createControl(key, value), hold)
+            self.specs[key] = value
+        return (200, json.dumps({'ready': list(controls), 'held': len(self.held)}).encode('utf-8'), 'application/json')
+
+    # Start signal: every initiator on hold fires its first round at once, then at the usual rate
+    def handleStartRequest(self, request):
+        if request.body:
+            epoch = json.loads(request.body.decode('utf-8')).get('epoch')
+            if epoch is not None: self.roundPhase = epoch % self.aggregationInterval
+        started = [self.controls[jointSetId] for jointSetId in self.held if jointSetId in self.controls]
+        for control in started:
+            self.tasks[control.id].append(asyncio.create_task(self.aggregationLoop(control, immediate=True)))
+        self.held.clear()
+        print(f"Start signal: {len(started)} initiators released")
+        return (200, json.dumps({'started': len(started)}).encode('utf-8'), 'application/json')
+
+    def createControl(self, key, value):
+        components = []
+        tupleSize = 0
+        for componentID, featureTuple in value['components'].items():
+            components.append(Component(componentID, featureTuple))
+            tupleSize = len(featureTuple)
+        return Control(key, value['masters'], value['slaves'], self.ip, value.get('port'), components,
+                       tupleSize, value['mu'], value.get('historySize', DEFAULT_HISTORY_SIZE), value.get('historyAge'),
+                       value.get('roundTimeout', ROUND_TIMEOUT), value.get('quorum'), value.get('roundDeadline'),
+                       value.get('missingSlavePolicy', MISSING_LAST_KNOWN))
+
+    async def startControl(self, control, hold=False):
+        self.controls[control.id] = control
+        self.pools[control.id] = AsyncConnectionPool(self.poolSize, self.poolIdleTimeout)
+        if control.port is not None:
+            self.servers[control.id] = await asyncio.start_server(
+                partial(serveConnection, handler=partial(self.handleControlRequest, control)), '', control.port)
+        self.tasks[control.id] = [asyncio.create_task(self.updateLoop(control))]
+        if control.isInitiator():
+            self.startInitiator(control, hold)
+        print(f"Control {control.id} started on {self.ip}:{self.port}{CONTROL_ROUTE}{control.id}"
+              + (f" and on port {control.port}" if control.port is not None else ""))
+
+    async def stopControl(self, jointSetId):
+        control = self.controls.pop(jointSetId, None)
+        if control is None:
+            return
+        self.specs.pop(jointSetId, None)
+        self.held.discard(jointSetId)
+        for task in self.tasks.pop(jointSetId): task.cancel()
+        server = self.servers.pop(jointSetId, None)
+        if server is not None:
+            server.close()
+            await server.wait_closed()
+        self.pools.pop(jointSetId).close()
+        print(f"Control {jointSetId} stopped")
+
+    # Only masters, slaves or \mu changed: the running control is updated in place and keeps its
+    # weight history; anything else (components, port, round settings) restarts it
+    async def reconfigureControl(self, control, value, hold=False):
+        settings = lambda spec: {key: spec[key] for key in spec.keys() - RECONFIGURABLE}
+        if settings(self.specs[control.id]) != settings(value):
+            await self.stopControl(control.id)
+            await self.startControl(self.createControl(control.id, value), hold)
+            return
+        control.reconfigure(value['masters'], value['slaves'], value['mu'])
+        tasks = self.tasks[control.id]
+        if control.isInitiator() and len(tasks) == 1 and control.id not in self.held:
+            self.startInitiator(control, hold)
+        elif not control.isInitiator():
+            self.held.discard(control.id)
+            if len(tasks) == 2: tasks.pop().cancel()
+        print(f"Control {control.id} reconfigured")
+
+    def startInitiator(self, control, hold):
+        if hold:
+            self.held.add(control.id)
+        else:
+            self.tasks[control.id].append(asyncio.create_task(self.aggregationLoop(control)))
+
+    async def handleControlRequest(self, control, request):
+        try:
+            data = self.decodeMessage(request.headers.get('content-type'), request.body)
+        except WireFormatError as e:
+            return (415, str(e).encode('utf-8'))
+        self.deliver(control, data)
+        return (200, b'', 'text/plain', self.acceptHeaders())
+
+    # Messages coalesced by another manager for controls hosted here; nothing is delivered unless
+    # every frame decodes
+    async def handleBatchRequest(self, request):
+        try:
+            messages = [(masterID, self.decodeMessage(contentType, body)) for masterID, contentType, body in decodeBatch(request.body)]
+        except WireFormatError as e:
+            return (415, str(e).encode('utf-8'))
+        for masterID, data in messages:
+            control = self.controls.get(masterID)
+            if control is None:
+                print(f"Batch message for unknown control {masterID} dropped")
+                continue
+            try:
+                self.deliver(control, data)
+            except Exception as e: # one bad message must not cost the others of the batch
+                print(f"An error occured delivering to {masterID}: {e!r}")
+        return (200, b'', 'text/plain', self.acceptHeaders())
+
+    # Deserialise the message from slave, binary or JSON depending on its content type
+    def decodeMessage(self, contentType, body):
+        if contentType == BINARY_CONTENT_TYPE:
+            if self.wireCodec is None:
+                raise WireFormatError("no component index deployed")
+            return self.wireCodec.decode(body)
+        return decodeJson(body)
+
+    # Tell the slave which formats this master can decode
+    def acceptHeaders(self):
+        return {'Accept': ACCEPTED_CONTENT_TYPES} if self.wireCodec is not None else {}
+
+    # Hand a slave message to a control; the response (if any) goes to the masters in the background
+    def deliver(self, control, data):
+        message = control.receiveFromSlave(data)
+        if message is not None:
+            self.spawn(self.sendToAllMasters(control, message))
+
+    async def localDeliveryLoop(self):
+        while True:
+            masterID, message = await self.localQueue.get()
+            control = self.controls.get(masterID)
+            if control is None:
+                continue
+            try:
+                self.deliver(control, message)
+            except Exception as e: # one bad message must not stop delivery between the controls of this manager
+                print(f"An error occured delivering to {masterID}: {e!r}")
+
+    # The first weights are computed on start, so a control can take part in rounds right away
+    async def updateLoop(self, control):
+        while True:
+            control.updateWeights()
+            await asyncio.sleep(UPDATE_INTERVAL)
+
+    # Rounds are fired at a fixed rate without waiting for the previous one, so several rounds
+    # can be in flight along the hierarchy at the same time; the first one at the next point of the
+    # round grid, or at once (as the current round) when released by the start signal.
+    # The round ID is the index of the grid point, so initiators started or restarted at any time
+    # (e.g. by a redeployment) agree on it and their masters can match their messages
+    async def aggregationLoop(self, control, immediate=False):
+        roundID = self.currentRound() + (0 if immediate else 1)
+        while True:
+            await asyncio.sleep(max(0.0, self.roundPhase + roundID * self.aggregationInterval - time.time()))
+            message = control.initiateAggregation(roundID)
+            if message is not None:
+                self.spawn(self.sendToAllMasters(control, message))
+            # Skip grid points missed while busy rather than firing them late under an old ID
+            roundID = max(roundID + 1, self.currentRound())
+
+    def currentRound(self):
+        return math.floor((time.time() - self.roundPhase) / self.aggregationInterval)
+
+    def spawn(self, coroutine):
+        task = asyncio.create_task(coroutine)
+        self.background.add(task)
+        task.add_done_callback(self.background.discard)
+        return task
+
+    async def expiryLoop(self):
+        while True:
+            await asyncio.sleep(EXPIRY_INTERVAL)
+            for control in list(self.controls.values()):
+                try:
+                    messages = control.expireRounds()
+                except Exception as e: # keep sweeping the other controls, and on the next interval
+                    print(f"An error occured expiring rounds of {control.id}: {e!r}")
+                    continue
+                for message in messages: self.spawn(self.sendToAllMasters(control, message))
+
+    # Masters hosted by this manager get the message through the in-memory queue; the others are
+    # sent to concurrently, so the call takes about as long as the slowest master.
+    # Returns masterID-->(status, error) with status None when the master failed or timed out
+    async def sendToAllMasters(self, control, message):
+        results = {}
+        remoteMasterIDs = []
+        for masterID in control.masters:
+            if masterID in self.controls:
+                self.localQueue.put_nowait((masterID, message))
+                results[masterID] = (200, None)
+            else:
+                remoteMasterIDs.append(masterID)
+        if remoteMasterIDs:
+            encoded = {} # content type-->body, each format is encoded at most once
+            remoteResults = await asyncio.gather(*(self.sendToMaster(control, masterID, control.masters[masterID], message, encoded) for masterID in remoteMasterIDs))
+            results.update(zip(remoteMasterIDs, remoteResults))
+        return results
+
+    # Binary is only used once the master has advertised it (content negotiation), JSON otherwise
+    def contentTypeFor(self, masterIP, message):
+        if (self.preferBinary and masterIP in self.binaryMasters and masterIP not in self.binaryRefused
+                and self.wireCodec is not None and self.wireCodec.canEncode(message)):
+            return BINARY_CONTENT_TYPE
+        return JSON_CONTENT_TYPE
+
+    def encodeMessage(self, message, contentType, encoded):
+        if contentType not in encoded:
+            encoded[contentType] = self.wireCodec.encode(message) if contentType == BINARY_CONTENT_TYPE else encodeJson(message)
+        return encoded[contentType]
+
+    async def sendToMaster(self, control, masterID, masterIP, message, encoded):
+        managerAddress = managerAddressOf(masterID, masterIP)
+        if self.flushWindow and managerAddress is not None and managerAddress not in self.batchRefused:
+            return await self.coalesce(managerAddress, masterID, masterIP, message, encoded)
+        # A control stopped while its messages were in flight falls back to the shared pool
+        return await self.postToMaster(self.pools.get(control.id, self.batchPool), masterIP, message, encoded)
+
+    async def postToMaster(self, pool, masterIP, message, encoded):
+        contentType = self.contentTypeFor(masterIP, message)
+        try:
+            body = self.encodeMessage(message, contentType, encoded)
+            status, responseBody, headers = await pool.post(masterIP, body, contentType, timeout=self.masterTimeout)
+            if status == 415 and contentType == BINARY_CONTENT_TYPE:
+                # The master cannot decode it (e.g. it holds another component index), fall back to JSON
+                self.binaryRefused.add(masterIP)
+                return await self.postToMaster(pool, masterIP, message, encoded)
+            if BINARY_CONTENT_TYPE in headers.get('accept', ''):
+                self.binaryMasters.add(masterIP)
+            if status == 200:
+                print(responseBody.decode('utf-8'))
+            else:
+                print(f"failed with code {status}")
+            return (status, None)
+        except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError, ValueError, IndexError) as e:
+            # Unreachable, slow, or answering with a truncated or malformed response: one master's
+            # failure must not lose the results of the others in sendToAllMasters
+            print(f"An error occured: {e!r}")
+            return (None, e)
+
+    # Queue a message for the manager hosting the master; everything queued for that manager within
+    # the flush window leaves in a single request. Resolves to the (status, error) of the batch
+    async def coalesce(self, managerAddress, masterID, masterIP, message, encoded):
+        outbox = self.outbox.setdefault(managerAddress, [])
+        if not outbox:
+            self.spawn(self.flushLater(managerAddress))
+        result = asyncio.get_running_loop().create_future()
+        outbox.append((masterID, masterIP, message, encoded, result))
+        return await result
+
+    async def flushLater(self, managerAddress):
+        await asyncio.sleep(self.flushWindow)
+        batch = self.outbox.pop(managerAddress)
+        error = None
+        try:
+            await self.sendBatch(managerAddress, batch)
+        except Exception as e: # unreachable, timed out, truncated or malformed response...
+            print(f"An error occured: {e!r}")
+            error = e
+        finally:
+            # ...or cancelled: every coalesced sendToMaster awaits one of these futures, none may stay pending
+            for *_, result in batch:
+                if not result.done(): result.set_result((None, error if error is not None else ConnectionError("batch not sent")))
+
+    async def sendBatch(self, managerAddress, batch):
+        frames = []
+        for masterID, masterIP, message, encoded, _ in batch:
+            contentType = self.contentTypeFor(masterIP, message)
+            frames.append((masterID, contentType, self.encodeMessage(message, contentType, encoded)))
+        status, responseBody, headers = await self.batchPool.post(managerAddress + BATCH_ROUTE, encodeBatch(frames), BATCH_CONTENT_TYPE,
+                                                                  timeout=self.masterTimeout)
+        if status in (404, 415):
+            # The manager does not take batches (404) or could not decode a binary frame (415):
+            # send these messages one by one, and stop coalescing for it in the first case
+            if status == 404:
+                self.batchRefused.add(managerAddress)
+            else:
+                self.binaryRefused.update(masterIP for masterID, masterIP, *_ in batch)
+            for masterID, masterIP, message, encoded, result in batch:
+                result.set_result(await self.postToMaster(self.batchPool, masterIP, message, encoded))
+            return
+        if BINARY_CONTENT_TYPE in headers.get('accept', ''):
+            self.binaryMasters.update(masterIP for masterID, masterIP, *_ in batch)
+        if status != 200:
+            print(f"failed with code {status}")
+        for *_, result in batch: result.set_result((status, None))
+
+    async def serve(self):
+        handler = partial(serveConnection, handler=self.handleManagerRequest)
+        servers = []
+        if self.port is not None:
+            servers.append(await asyncio.start_server(handler, self.ip, self.port, backlog=LISTEN_BACKLOG))
+            print('Control Manager Server listening on ' + self.ip + ":" + str(self.port))
+        if self.unixPath is not None:
+            if os.path.exists(self.unixPath): os.unlink(self.unixPath) # left over by a previous run
+            servers.append(await asyncio.start_unix_server(handler, self.unixPath, backlog=LISTEN_BACKLOG))
+            print('Control Manager Server listening on unix socket ' + self.unixPath)
+        self.spawn(self.expiryLoop())
+        self.spawn(self.localDeliveryLoop())
+        await asyncio.gather(*(server.serve_forever() for server in servers))
+
+# '<manager address>/control/<masterID>' --> '<manager address>', None for controls on a dedicated port
+def managerAddressOf(masterID, masterIP):
+    route = CONTROL_ROUTE + masterID
+    return masterIP[:-len(route)] if masterIP.endswith(route) else None
+
+def run_manager_server(ip, port, unixPath=None):
+    asyncio.run(ControlManager(ip, port, unixPath=unixPath).serve())
 
 if __name__ == "__main__":
     ip = '127.0.0.1'
     port = 8080
-    #ControlManager.next_port = port
-    run_manager_server(ip, port)
\ No newline at end of file
+    unixPath = f'/tmp/control-manager-{port}.sock'
+    run_manager_server(ip, port, unixPath)
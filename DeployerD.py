@@ -1,10 +1,27 @@
+import http.client
+import json
 import random
-import requests
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from AsyncHttp import splitUrl, unixUrl
+from ConnectionPool import HttpConnectionPool
+from ControlManagerD import CONTROL_ROUTE, START_ROUTE, CONTROL_SETTINGS, MISSING_LAST_KNOWN, MISSING_EXCLUDE
+from Placement import randomPlacement, balancedPlacement, partitionedPlacement
+
+DEPLOY_TIMEOUT = 30.0 # seconds allowed to each manager to take its deployment
 
 class Host:
-    def __init__(self, ip, port):
+    def __init__(self, ip, port, unixPath=None, capacity=None):
         self.ip = ip
-        self.port = port
+        self.port = port # None when the manager only listens on its Unix socket
+        self.unixPath = unixPath # Unix socket of the manager, used by controls on the same machine
+        self.capacity = capacity # largest estimated load placed on the manager, None for no limit
+    def url(self):
+        if self.port is None: return unixUrl(self.unixPath)
+        return self.ip + ":" + str(self.port)
+    def machine(self):
+        return splitUrl(self.ip)[0]
 
 class Component:
     def __init__(self, id, featureTuple):
@@ -21,6 +38,8 @@ class JointSet:
     def updateDynamicMap(self, dynamic):
         for component in self.jointComponents: dynamic[component.id] = self.id
         return 
+    def getMuSlice(self, mu):
+        return {component.id: mu[component.id] for component in self.jointComponents if component.id in mu}
     def getComponentMap(self):
         map = {}
         for component in self.jointComponents: 
@@ -50,138 +69,343 @@ class HierarchicalControl:
         self.dynamic = dynamic
         self.masters = self.createMasters()
         self.slaves = self.createSlaves()
+        # Topological order from the enders down to the initiators; the level of a joint set is the
+        # length of its longest path up to an ender, so a round crosses criticalPathLength hops at most
+        self.order, self.levels = self.createLevels()
+        self.criticalPathLength = max(self.levels.values(), default=0)
 
+    # One pass over \mu: the joint set of each component becomes a master of the joint set it maps to
     def createMasters(self):
-        masters = {}
-        for jointSetId, value in self.architectureGenerator.jointSets.items(): 
-            m = set()        
-            for componentId, jointSetId2 in self.architectureGenerator.mu.items():
-                if(jointSetId == jointSetId2): m.add(self.dynamic[componentId])            
-            masters[jointSetId] = m
+        masters = {jointSetId: set() for jointSetId in self.architectureGenerator.jointSets}
+        for componentId, jointSetId in self.architectureGenerator.mu.items():
+            if jointSetId in masters: masters[jointSetId].add(self.dynamic[componentId])
         return masters
 
+    # Inverted masters index, slaves are listed in joint set order
     def createSlaves(self):
-        slaves = {}
-        for jointSetId, value in self.architectureGenerator.jointSets.items():  
-            s = []    
-            for jointSetId2, mastersL in self.masters.items():        
-                if jointSetId in mastersL: s.append(jointSetId2)
-            slaves[jointSetId] = s
+        slaves = {jointSetId: [] for jointSetId in self.architectureGenerator.jointSets}
+        for jointSetId, mastersL in self.masters.items():
+            for master in mastersL: slaves[master].append(jointSetId)
         return slaves
 
+    # Kahn's algorithm over the master links; a joint set left over sits on a cycle (or below one),
+    # where rounds would wait forever, so the hierarchy is rejected
+    def createLevels(self):
+        pendingMasters = {jointSetId: len(mastersL) for jointSetId, mastersL in self.masters.items()}
+        levels = {jointSetId: 0 for jointSetId in self.masters}
+        order = [jointSetId for jointSetId, count in pendingMasters.items() if count == 0]
+        for jointSetId in order: # grows while iterating
+            for slave in self.slaves[jointSetId]:
+                levels[slave] = max(levels[slave], levels[jointSetId] + 1)
+                pendingMasters[slave] -= 1
+                if pendingMasters[slave] == 0: order.append(slave)
+        if len(order) < len(self.masters):
+            raise ValueError(f"control hierarchy has a cycle: {' -> '.join(self.findCycle(pendingMasters))}")
+        return order, levels
+
+    # Follow unresolved master links from a joint set left over by createLevels until one repeats
+    def findCycle(self, pendingMasters):
+        jointSetId = next(jointSetId for jointSetId, count in pendingMasters.items() if count > 0)
+        path = []
+        seen = {}
+        while jointSetId not in seen:
+            seen[jointSetId] = len(path)
+            path.append(jointSetId)
+            jointSetId = min(master for master in self.masters[jointSetId] if pendingMasters[master] > 0)
+        return path[seen[jointSetId]:] + [jointSetId]
+
 class Deployer:
-    def __init__(self, hierarchicalControl, controlManagers): 
+    def __init__(self, hierarchicalControl, controlManagers, connectionPool=None): 
         self.hierarchicalControl = hierarchicalControl
         self.controlManagers = controlManagers
+        self.connectionPool = connectionPool if connectionPool is not None else HttpConnectionPool() # keep-alive connections to the managers
+        # Managers are identified by their address, Host.url(): unlike ip:port it tells apart managers
+        # that only listen on their Unix socket
+        self.allocation = {} # jointSetId-->manager address
+        self.allocationIP = {} # manager address-->[jointSetId]
+        self.controlAddresses = {} # jointSetId-->route of the control on the TCP listener of its manager
+        self.controlHosts = {} # jointSetId-->Host of its manager
+        self.deployed = {} # manager address-->{jointSetId: control description} acknowledged by the manager
+        self.deployedIndexes = {} # manager address-->component index acknowledged by the manager
+        self.roundEpoch = time.time() # sent with every start signal, the managers fire rounds in phase with it
+        self.controlSettings = {} # setting-->value sent to every control, see configure()
+        self.jointSetSettings = {} # jointSetId-->{setting: value} overriding controlSettings
+        for manager in controlManagers: self.allocationIP[manager.url()] = []
+
+    # strategy is 'random' (any manager), 'balanced' (even estimated load) or 'partitioned' (fewest
+    # master/slave edges across managers within a load tolerance), see Placement
+    def allocate(self, strategy='random'):
+        if strategy == 'random':
+            placement = randomPlacement(self.hierarchicalControl, self.controlManagers, random)
+        elif strategy == 'balanced':
+            placement = balancedPlacement(self.hierarchicalControl, self.controlManagers)
+        elif strategy == 'partitioned':
+            placement = partitionedPlacement(self.hierarchicalControl, self.controlManagers)
+        else:
+            raise ValueError(f"unknown placement strategy {strategy}")
+        self.assign(placement)
+
+    def assign(self, placement):
         self.allocation = {}
-        self.allocationIP = {}
-        self.controlIPs = {}
-        self.controlPorts = {}
-        for manager in controlManagers: self.allocationIP[manager.ip + ":" + str(manager.port)] = []
-
-    def allocate(self):
-        for jointSetId, jointSet in self.hierarchicalControl.architectureGenerator.jointSets.items():        
-            random_index = random.randint(0, len(self.controlManagers) - 1)                            
-            address = self.controlManagers[random_index].ip + ":" + str(self.controlManagers[random_index].port)
+        self.controlAddresses = {}
+        self.controlHosts = {}
+        for address in self.allocationIP: self.allocationIP[address] = []
+        for jointSetId in self.hierarchicalControl.architectureGenerator.jointSets:        
+            manager = placement[jointSetId]
+            address = manager.url()
             self.allocation[jointSetId] = address
             self.allocationIP[address].append(jointSetId)
-            self.controlIPs[jointSetId] = self.controlManagers[random_index].ip
-            self.controlPorts[jointSetId] = self.controlManagers[random_index].port+len(self.allocationIP[address])
-
-    def deploy(self):
-        for manager in self.controlManagers:
-            data = {}                                    
-            for jointSetId in self.allocationIP[manager.ip + ":" + str(manager.port)]:
-                data[jointSetId] = {}
-
-                data[jointSetId]['masters'] = {}                
-                for master in self.hierarchicalControl.masters[jointSetId]:                    
-                    data[jointSetId]['masters'][master] = self.controlIPs[master] + ":" + str(self.controlPorts[master])
-                data[jointSetId]['slaves'] = {}
-                for slave in self.hierarchicalControl.slaves[jointSetId]:
-                    data[jointSetId]['slaves'][slave] = self.controlIPs[slave] + ":" + str(self.controlPorts[slave])
-                data[jointSetId]['components'] = self.hierarchicalControl.architectureGenerator.jointSets[jointSetId].getComponentMap()
-                data[jointSetId]['mu'] = self.hierarchicalControl.architectureGenerator.mu                                           
-                data[jointSetId]['port'] = self.controlPorts[jointSetId]
-            try:            
-                response = requests.post(manager.ip + ":" + str(manager.port), json=data)            
-                if response.status_code == 200:
-                    print(response.text)
-                else:
-                    print(f"failed with code {response.status_code}")   
-            except response.exception.requestException as e:
-                print(f"An error occured: {e}")    
+            self.controlAddresses[jointSetId] = address + CONTROL_ROUTE + jointSetId
+            self.controlHosts[jointSetId] = manager
+
+    # Address of a control as seen from another one: the Unix socket of its manager when both
+    # run on the same machine (or the manager has no TCP listener), TCP otherwise
+    def controlAddress(self, jointSetId, fromJointSetId):
+        host = self.controlHosts[jointSetId]
+        if host.unixPath is not None and (host.port is None or host.machine() == self.controlHosts[fromJointSetId].machine()):
+            return unixUrl(host.unixPath, CONTROL_ROUTE + jointSetId)
+        return self.controlAddresses[jointSetId]
+
+    # Settings of the controls (CONTROL_SETTINGS, e.g. historySize=100, or quorum=2 and roundDeadline=0.5
+    # for masters that should not wait for straggling slaves), for all of them or only for
+    # the given joint sets; None removes a setting (a joint set then gets the one for all controls, if any,
+    # else the manager default). They are sent with the next (re)deployment, controls whose settings
+    # changed are restarted
+    def configure(self, jointSetIds=None, **settings):
+        unknown = settings.keys() - CONTROL_SETTINGS
+        if unknown:
+            raise ValueError(f"unknown control settings {sorted(unknown)}")
+        if settings.get('missingSlavePolicy') not in (None, MISSING_LAST_KNOWN, MISSING_EXCLUDE):
+            raise ValueError(f"unknown missing slave policy {settings['missingSlavePolicy']}")
+        for target in ([self.controlSettings] if jointSetIds is None
+                       else [self.jointSetSettings.setdefault(jointSetId, {}) for jointSetId in jointSetIds]):
+            for setting, value in settings.items():
+                if value is None: target.pop(setting, None)
+                else: target[setting] = value
+
+    def controlSpec(self, jointSetId):
+        data = {}
+        data['masters'] = {}                
+        for master in self.hierarchicalControl.masters[jointSetId]:                    
+            data['masters'][master] = self.controlAddress(master, jointSetId)
+        data['slaves'] = {}
+        for slave in self.hierarchicalControl.slaves[jointSetId]:
+            data['slaves'][slave] = self.controlAddress(slave, jointSetId)
+        data['components'] = self.hierarchicalControl.architectureGenerator.jointSets[jointSetId].getComponentMap()
+        # A control only looks up \mu for its own components
+        data['mu'] = self.hierarchicalControl.architectureGenerator.jointSets[jointSetId].getMuSlice(self.hierarchicalControl.architectureGenerator.mu)
+        data.update(self.controlSettings)
+        data.update(self.jointSetSettings.get(jointSetId, {}))
+        return data
+
+    # Payload of one manager: the component index shared by all managers, the joint sets allocated
+    # to it and the ones it ran before that are no longer allocated to it
+    def buildPayload(self, manager, componentIndex):
+        address = manager.url()
+        data = {jointSetId: self.controlSpec(jointSetId) for jointSetId in self.allocationIP[address]}
+        return {'componentIndex': componentIndex, 'controls': data, 'remove': self.removedFrom(address)}
+
+    # Only what differs from what the manager acknowledged last time; None when nothing does
+    def buildChanges(self, manager, componentIndex):
+        address = manager.url()
+        deployed = self.deployed.get(address, {})
+        data = {}
+        for jointSetId in self.allocationIP[address]:
+            spec = self.controlSpec(jointSetId)
+            if spec != deployed.get(jointSetId): data[jointSetId] = spec
+        removed = self.removedFrom(address)
+        if not data and not removed and self.deployedIndexes.get(address) == componentIndex:
+            return None
+        return {'componentIndex': componentIndex, 'controls': data, 'remove': removed}
+
+    def removedFrom(self, address):
+        return [jointSetId for jointSetId in self.deployed.get(address, {}) if self.allocation.get(jointSetId) != address]
+
+    # Deploy to all managers concurrently, each with its own timeout. Initiators are deployed on hold
+    # and, when every manager reported its controls listening, released by one start signal; with
+    # start=False (or after a failure) they wait for start().
+    # Returns manager address-->DeployResult
+    def deploy(self, timeout=DEPLOY_TIMEOUT, maxWorkers=None, start=True):
+        componentIndex = self.componentIndex()
+        return self.deployPayloads({manager: self.buildPayload(manager, componentIndex) for manager in self.controlManagers}, timeout, maxWorkers, start)
+
+    # Move to a new version of the architecture, shipping only the differences: joint sets still in
+    # it keep their manager, new ones go where the estimated load is lowest, and each manager gets
+    # its new or changed controls plus the IDs of those to stop. Managers without changes are left
+    # alone; returns manager address-->DeployResult for the others
+    def redeploy(self, hierarchicalControl, timeout=DEPLOY_TIMEOUT, maxWorkers=None, start=True):
+        kept = {jointSetId: host for jointSetId, host in self.controlHosts.items() if jointSetId in hierarchicalControl.architectureGenerator.jointSets}
+        self.hierarchicalControl = hierarchicalControl
+        self.assign(balancedPlacement(hierarchicalControl, self.controlManagers, kept))
+        componentIndex = self.componentIndex()
+        payloads = {manager: self.buildChanges(manager, componentIndex) for manager in self.controlManagers}
+        return self.deployPayloads({manager: payload for manager, payload in payloads.items() if payload is not None}, timeout, maxWorkers, start)
+
+    # Every manager gets the same component index, which gives each component its ID on the binary wire format
+    def componentIndex(self):
+        return list(self.hierarchicalControl.architectureGenerator.components)
+
+    # Controls start in two waves. First go every control that only reacts to its slaves, in level
+    # order from the enders down. The initiators follow once their manager took the first wave, so
+    # no round is fired before the controls it goes through exist.
+    def deployPayloads(self, payloads, timeout, maxWorkers, start):
+        levels = self.hierarchicalControl.levels
+        waves = [{}, {}]
+        for manager, payload in payloads.items():
+            payload = dict(payload, hold=True)
+            controls = sorted(payload['controls'], key=levels.__getitem__)
+            initiators = [jointSetId for jointSetId in controls if not self.hierarchicalControl.slaves[jointSetId]]
+            waves[0][manager] = dict(payload, controls={jointSetId: payload['controls'][jointSetId] for jointSetId in controls
+                                                        if self.hierarchicalControl.slaves[jointSetId]})
+            if initiators:
+                waves[1][manager] = dict(payload, controls={jointSetId: payload['controls'][jointSetId] for jointSetId in initiators}, remove=[])
+        results = self.deployWave(waves[0], timeout, maxWorkers)
+        initiatorResults = self.deployWave({manager: payload for manager, payload in waves[1].items()
+                                            if results[manager.url()].succeeded()}, timeout, maxWorkers)
+        for address, result in initiatorResults.items(): results[address] = results[address].followedBy(result)
+        if start and all(result.succeeded() for result in results.values()):
+            for address, result in self.start(payloads, timeout, maxWorkers).items(): results[address] = results[address].followedBy(result)
+        elif start:
+            print("Start signal withheld: not every control manager is ready, call start() once they are")
+        return results
+
+    # Release the initiators on hold on the given managers (all by default) with one start signal each.
+    # Returns manager address-->DeployResult of the signal
+    def start(self, managers=None, timeout=DEPLOY_TIMEOUT, maxWorkers=None):
+        managers = list(self.controlManagers if managers is None else managers)
+        if not managers:
+            return {}
+        with ThreadPoolExecutor(max_workers=maxWorkers or len(managers)) as executor:
+            futures = [executor.submit(self.startOn, manager, timeout) for manager in managers]
+            return {result.address: result for result in (future.result() for future in futures)}
+
+    def startOn(self, manager, timeout):
+        start = time.perf_counter()
+        try:
+            status, responseBody = self.connectionPool.post(manager.url() + START_ROUTE, json.dumps({'epoch': self.roundEpoch}).encode('utf-8'), timeout=timeout)
+            error = None if status == 200 else f"start failed with code {status}"
+        except (OSError, http.client.HTTPException) as e:
+            status, error = None, f"An error occured: {e!r}"
+        return DeployResult(manager.url(), 0, status, error, time.perf_counter() - start)
+
+    def deployWave(self, payloads, timeout, maxWorkers):
+        if not payloads:
+            return {}
+        with ThreadPoolExecutor(max_workers=maxWorkers or max(1, len(payloads))) as executor:
+            futures = [executor.submit(self.deployTo, manager, payload, timeout) for manager, payload in payloads.items()]
+            return {result.address: result for result in (future.result() for future in futures)}
+
+    def deployTo(self, manager, payload, timeout):
+        address = manager.url()
+        start = time.perf_counter()
+        try:            
+            status, responseBody = self.connectionPool.post(manager.url(), json.dumps(payload).encode('utf-8'), timeout=timeout)            
+            error = None if status == 200 else f"failed with code {status}"
+        except (OSError, http.client.HTTPException) as e:
+            status, error = None, f"An error occured: {e!r}"
+        if error is None:
+            # Remember what the manager runs now, the next redeployment is computed against it
+            deployed = self.deployed.setdefault(address, {})
+            deployed.update(payload['controls'])
+            for jointSetId in payload['remove']: deployed.pop(jointSetId, None)
+            self.deployedIndexes[address] = payload['componentIndex']
+        return DeployResult(address, len(payload['controls']), status, error, time.perf_counter() - start, len(payload['remove']))
+
+# Outcome of the deployment to one manager
+class DeployResult:
+    def __init__(self, address, controls, status, error, elapsed, removed=0):
+        self.address = address
+        self.controls = controls # number of joint sets sent to the manager
+        self.removed = removed # number of joint sets the manager was asked to stop
+        self.status = status # HTTP status, None when the manager could not be reached in time
+        self.error = error
+        self.elapsed = elapsed # seconds
+    def succeeded(self):
+        return self.error is None
+    # Combined outcome of two successive requests to the same manager
+    def followedBy(self, result):
+        return DeployResult(self.address, self.controls + result.controls, result.status, result.error,
+                            self.elapsed + result.elapsed, self.removed + result.removed)
+    def __str__(self):
+        return (f"{self.address}: {self.controls} controls" + (f", {self.removed} removed" if self.removed else "")
+                + f" in {self.elapsed * 1000:.1f} ms, " + ("ok" if self.succeeded() else self.error))
             
-dynamic = {}
-
-# STAGE 1: Define software components 
-c1 = Component("C1", (0.5,0.7))
-c2 = Component("C2", (0.3,0.2))
-c3 = Component("C3", (0.6, 0.3))
-c4 = Component("C4", (0.9, 0.9))
-c5 = Component("C5", (0.3, 0.2))
-c6 = Component("C6", (0.43, 0.56))
-c7 = Component("C7", (0.3, 0.4))
-c8 = Component("C8", (0.3,0.3))
-c9 = Component("C9", (0.9,0.3))
-c10 = Component("C10", (0.8, 0.2))
-c11 = Component("C11", (0.7, 0.3))
-c12 = Component("C12", (0.2, 0.5))
-c13 = Component("C13", (0.5, 0.4))
-
-# STAGE 2: Group software components into joint sets
-a1 = JointSet([c1], "O1"); a1.updateDynamicMap(dynamic)
-a2 = JointSet([c2,c3], "O2"); a2.updateDynamicMap(dynamic)
-a3 = JointSet([c4,c5, c6], "O3"); a3.updateDynamicMap(dynamic)
-a4 = JointSet([c7,c8], "O4"); a4.updateDynamicMap(dynamic)
-a5 = JointSet([c9, c10, c11, c12], "O5"); a5.updateDynamicMap(dynamic)
-a6 = JointSet([c13], "O6"); a6.updateDynamicMap(dynamic)
-
-# STAGE 3: Create software architecture generator
-generator = ArchitectureGenerator()
-generator.addComponent(c1)
-generator.addComponent(c2)
-generator.addComponent(c3)
-generator.addComponent(c4)
-generator.addComponent(c5)
-generator.addComponent(c6)
-generator.addComponent(c7)
-generator.addComponent(c8)
-generator.addComponent(c9)
-generator.addComponent(c10)
-generator.addComponent(c11)
-generator.addComponent(c12)
-generator.addComponent(c13)
-generator.addJointSet(a1)
-generator.addJointSet(a2)
-generator.addJointSet(a3)
-generator.addJointSet(a4)
-generator.addJointSet(a5)
-generator.addJointSet(a6)
-
-# STAGE 4: Define mappings from components to joint sets (\mu)
-generator.addMappingToMu("C1", "O2"); 
-generator.addMappingToMu("C2", "O3"); 
-generator.addMappingToMu("C3", "O3"); 
-generator.addMappingToMu("C4", "O6"); 
-generator.addMappingToMu("C5", "O4"); 
-generator.addMappingToMu("C6", "O5"); 
-generator.addMappingToMu("C7", "O5"); 
-generator.addMappingToMu("C8", "O5"); 
-generator.addMappingToMu("C9", "O6"); 
-generator.addMappingToMu("C10", "O6"); 
-generator.addMappingToMu("C11", "O6"); 
-generator.addMappingToMu("C12", "O6"); 
-generator.addMappingToMu("C13", ""); 
-
-# STAGE 5: Use the generator to construct the structure of control
-controlStructure = HierarchicalControl(generator, dynamic)
-#print(controlStructure.masters)       
-#print(controlStructure.slaves)       
-
-# STAGE 6: Allocate each joint set to a different IP, create a control for it and send it for remote deployment
-host1 = Host('http://127.0.0.1', 8080)
-host2 = Host('http://127.0.0.1', 8090)
-deployer = Deployer(controlStructure, [host1])
-deployer.allocate()
-deployer.deploy()
\ No newline at end of file
+if __name__ == "__main__":
+    dynamic = {}
+
+    # STAGE 1: Define software components 
+    c1 = Component("C1", (0.5,0.7))
+    c2 = Component("C2", (0.3,0.2))
+    c3 = Component("C3", (0.6, 0.3))
+    c4 = Component("C4", (0.9, 0.9))
+    c5 = Component("C5", (0.3, 0.2))
+    c6 = Component("C6", (0.43, 0.56))
+    c7 = Component("C7", (0.3, 0.4))
+    c8 = Component("C8", (0.3,0.3))
+    c9 = Component("C9", (0.9,0.3))
+    c10 = Component("C10", (0.8, 0.2))
+    c11 = Component("C11", (0.7, 0.3))
+    c12 = Component("C12", (0.2, 0.5))
+    c13 = Component("C13", (0.5, 0.4))
+
+    # STAGE 2: Group software components into joint sets
+    a1 = JointSet([c1], "O1"); a1.updateDynamicMap(dynamic)
+    a2 = JointSet([c2,c3], "O2"); a2.updateDynamicMap(dynamic)
+    a3 = JointSet([c4,c5, c6], "O3"); a3.updateDynamicMap(dynamic)
+    a4 = JointSet([c7,c8], "O4"); a4.updateDynamicMap(dynamic)
+    a5 = JointSet([c9, c10, c11, c12], "O5"); a5.updateDynamicMap(dynamic)
+    a6 = JointSet([c13], "O6"); a6.updateDynamicMap(dynamic)
+
+    # STAGE 3: Create software architecture generator
+    generator = ArchitectureGenerator()
+    generator.addComponent(c1)
+    generator.addComponent(c2)
+    generator.addComponent(c3)
+    generator.addComponent(c4)
+    generator.addComponent(c5)
+    generator.addComponent(c6)
+    generator.addComponent(c7)
+    generator.addComponent(c8)
+    generator.addComponent(c9)
+    generator.addComponent(c10)
+    generator.addComponent(c11)
+    generator.addComponent(c12)
+    generator.addComponent(c13)
+    generator.addJointSet(a1)
+    generator.addJointSet(a2)
+    generator.addJointSet(a3)
+    generator.addJointSet(a4)
+    generator.addJointSet(a5)
+    generator.addJointSet(a6)
+
+    # STAGE 4: Define mappings from components to joint sets (\mu)
+    generator.addMappingToMu("C1", "O2"); 
+    generator.addMappingToMu("C2", "O3"); 
+    generator.addMappingToMu("C3", "O3"); 
+    generator.addMappingToMu("C4", "O6"); 
+    generator.addMappingToMu("C5", "O4"); 
+    generator.addMappingToMu("C6", "O5"); 
+    generator.addMappingToMu("C7", "O5"); 
+    generator.addMappingToMu("C8", "O5"); 
+    generator.addMappingToMu("C9", "O6"); 
+    generator.addMappingToMu("C10", "O6"); 
+    generator.addMappingToMu("C11", "O6"); 
+    generator.addMappingToMu("C12", "O6"); 
+    generator.addMappingToMu("C13", ""); 
+
+    # An architecture file (JSON Lines, see ArchitectureLoader) given on the command line replaces the sample
+    if len(sys.argv) > 1:
+        from ArchitectureLoader import loadArchitecture
+        generator, dynamic = loadArchitecture(sys.argv[1])
+
+    # STAGE 5: Use the generator to construct the structure of control
+    controlStructure = HierarchicalControl(generator, dynamic)
+    #print(controlStructure.masters)       
+    #print(controlStructure.slaves)       
+
+    # STAGE 6: Allocate each joint set to a different IP, create a control for it and send it for remote deployment
+    host1 = Host('http://127.0.0.1', 8080, '/tmp/control-manager-8080.sock')
+    host2 = Host('http://127.0.0.1', 8090, '/tmp/control-manager-8090.sock')
+    deployer = Deployer(controlStructure, [host1])
+    deployer.allocate()
+    for result in deployer.deploy().values(): print(result)
\ No newline at end of file
@@ -0,0 +1,139 @@
+from collections import deque
+
+# Placement strategies for Deployer.allocate: each returns jointSetId-->Host
+
+FAN_IN_COST = 1.0 # load of handling one slave message, relative to one component feature
+
+# Estimated load of the control of a joint set: its weight updates (components x tuple size)
+# plus the messages it receives from its slaves (fan-in)
+def estimateLoad(hierarchicalControl, jointSetId):
+    jointSet = hierarchicalControl.architectureGenerator.jointSets[jointSetId]
+    work = sum(len(component.featureTuple) for component in jointSet.jointComponents)
+    return work + FAN_IN_COST * len(hierarchicalControl.slaves[jointSetId])
+
+def randomPlacement(hierarchicalControl, hosts, rng):
+    return {jointSetId: hosts[rng.randint(0, len(hosts) - 1)] for jointSetId in hierarchicalControl.architectureGenerator.jointSets}
+
+# Greedy bin packing (longest processing time first): the heaviest joint sets are placed first,
+# each on the least loaded host among those it still fits on. When every host has a capacity the
+# loads are compared relative to it; when some host has none (unbounded), absolute loads are
+# compared and capacities only act as limits.
+# Joint sets in `fixed` (jointSetId-->Host) stay where they are and only add to the host loads.
+def balancedPlacement(hierarchicalControl, hosts, fixed=None):
+    loads = {jointSetId: estimateLoad(hierarchicalControl, jointSetId) for jointSetId in hierarchicalControl.architectureGenerator.jointSets}
+    hostLoads = [0.0] * len(hosts)
+    placement = {}
+    byHost = {id(host): index for index, host in enumerate(hosts)}
+    weights = [host.capacity for host in hosts] if all(host.capacity is not None for host in hosts) else [1.0] * len(hosts)
+    for jointSetId, host in (fixed or {}).items():
+        hostLoads[byHost[id(host)]] += loads.pop(jointSetId)
+        placement[jointSetId] = host
+    for jointSetId in sorted(loads, key=loads.get, reverse=True):
+        best = None
+        for index, host in enumerate(hosts):
+            if host.capacity is not None and hostLoads[index] + loads[jointSetId] > host.capacity:
+                continue
+            relative = (hostLoads[index] + loads[jointSetId]) / weights[index]
+            if best is None or relative < best[0]:
+                best = (relative, index)
+        if best is None:
+            raise ValueError(f"joint set {jointSetId} (load {loads[jointSetId]}) does not fit on any control manager")
+        hostLoads[best[1]] += loads[jointSetId]
+        placement[jointSetId] = hosts[best[1]]
+    return placement
+
+# Total estimated load placed on each host, in the order of hosts
+def hostLoads(hierarchicalControl, placement, hosts):
+    loads = {id(host): 0.0 for host in hosts}
+    for jointSetId, host in placement.items(): loads[id(host)] += estimateLoad(hierarchicalControl, jointSetId)
+    return [loads[id(host)] for host in hosts]
+
+IMBALANCE = 0.05 # load a host may take above its fair share when placement trades balance for locality
+REFINEMENT_PASSES = 10
+
+# Joint sets joined by a master/slave edge, which carries one message per aggregation round
+def neighbours(hierarchicalControl):
+    adjacency = {jointSetId: [] for jointSetId in hierarchicalControl.masters}
+    for jointSetId, mastersL in hierarchicalControl.masters.items():
+        for master in mastersL:
+            if master != jointSetId and master in adjacency:
+                adjacency[jointSetId].append(master)
+                adjacency[master].append(jointSetId)
+    return adjacency
+
+# Number of master/slave edges between joint sets placed on different hosts
+def edgeCut(hierarchicalControl, placement):
+    return sum(placement[master] is not placement[jointSetId]
+               for jointSetId, mastersL in hierarchicalControl.masters.items() for master in mastersL
+               if master != jointSetId and master in placement)
+
+# Graph partitioning that keeps master/slave edges on one host where it can: the joint sets are
+# laid out in breadth-first order over the hierarchy and cut into contiguous runs sized to each
+# host's fair share of the load, then refined Fiduccia-Mattheyses style (the single-move variant
+# of Kernighan-Lin) by moving joint sets to the host holding most of their neighbours while no
+# host goes above (1 + imbalance) times its fair share or its capacity.
+def partitionedPlacement(hierarchicalControl, hosts, imbalance=IMBALANCE, passes=REFINEMENT_PASSES):
+    jointSetIds = list(hierarchicalControl.architectureGenerator.jointSets)
+    loads = {jointSetId: estimateLoad(hierarchicalControl, jointSetId) for jointSetId in jointSetIds}
+    adjacency = neighbours(hierarchicalControl)
+    total = sum(loads.values())
+    # Fair shares follow the capacities when every host has one, otherwise the hosts are equal
+    shares = [host.capacity for host in hosts] if all(host.capacity is not None for host in hosts) else [1.0] * len(hosts)
+    fair = [total * share / sum(shares) for share in shares]
+
+    placement = {}
+    hostLoads = [0.0] * len(hosts)
+    index, filled = 0, 0.0
+    for jointSetId in breadthFirstOrder(jointSetIds, adjacency):
+        # Move on once the midpoint of the joint set lies past the current host's share
+        while index < len(hosts) - 1 and filled + loads[jointSetId] / 2 > sum(fair[:index + 1]):
+            index += 1
+        placement[jointSetId] = index
+        hostLoads[index] += loads[jointSetId]
+        filled += loads[jointSetId]
+    if any(host.capacity is not None and hostLoads[i] > host.capacity for i, host in enumerate(hosts)):
+        byHost = {id(host): i for i, host in enumerate(hosts)}
+        placement = {jointSetId: byHost[id(host)] for jointSetId, host in balancedPlacement(hierarchicalControl, hosts).items()}
+        hostLoads = [0.0] * len(hosts)
+        for jointSetId, i in placement.items(): hostLoads[i] += loads[jointSetId]
+    limits = [max((1 + imbalance) * fair[i], hostLoads[i]) for i in range(len(hosts))]
+    limits = [limit if host.capacity is None else min(limit, max(host.capacity, hostLoads[i])) for i, (limit, host) in enumerate(zip(limits, hosts))]
+
+    for _ in range(passes):
+        moved = False
+        for jointSetId in jointSetIds:
+            current = placement[jointSetId]
+            counts = {}
+            for neighbour in adjacency[jointSetId]:
+                counts[placement[neighbour]] = counts.get(placement[neighbour], 0) + 1
+            best, bestGain = None, 0
+            for target, count in counts.items():
+                gain = count - counts.get(current, 0)
+                if target != current and gain > bestGain and hostLoads[target] + loads[jointSetId] <= limits[target]:
+                    best, bestGain = target, gain
+            if best is not None:
+                placement[jointSetId] = best
+                hostLoads[current] -= loads[jointSetId]
+                hostLoads[best] += loads[jointSetId]
+                moved = True
+        if not moved:
+            break
+    return {jointSetId: hosts[i] for jointSetId, i in placement.items()}
+
+# Joint sets in breadth-first order from each not yet visited joint set, so neighbours end up close
+def breadthFirstOrder(jointSetIds, adjacency):
+    order = []
+    visited = set()
+    for root in jointSetIds:
+        if root in visited:
+            continue
+        visited.add(root)
+        queue = deque([root])
+        while queue:
+            jointSetId = queue.popleft()
+            order.append(jointSetId)
+            for neighbour in adjacency[jointSetId]:
+                if neighbour not in visited:
+                    visited.add(neighbour)
+                    queue.append(neighbour)
+    return order
@@ -0,0 +1,80 @@
+import random
+from DeployerD import Component, JointSet, ArchitectureGenerator
+
+SIZE_DISTRIBUTIONS = ('fixed', 'uniform', 'exponential') # joint set sizes around jointSetSize
+
+# Seeded synthetic SAG models for measurements beyond the sample in DeployerD.
+# Joint sets are numbered O0..O{n-1}; every component of O{i} maps (\mu) to a joint set with a
+# higher number, which makes O{i} one of its masters, so the control hierarchy is acyclic.
+# Components of the joint sets that map to nothing else map to "" (they are initiators).
+# Without a depth, components of O{i} map to random joint sets among the next `window` ones
+# and only the last joint set is an initiator. With a depth, the joint sets are laid out in
+# `depth` levels from the enders down to the initiators, each level about fanIn times larger
+# than the one above, and each joint set has up to fanIn slaves (one per component at most)
+# taken from a contiguous block of the level below.
+def generateArchitecture(componentCount, jointSetSize=10, tupleSize=2, seed=0, window=8, sizeDistribution='fixed', depth=None, fanIn=2):
+    if sizeDistribution not in SIZE_DISTRIBUTIONS:
+        raise ValueError(f"unknown joint set size distribution {sizeDistribution}")
+    rng = random.Random(seed)
+    generator = ArchitectureGenerator()
+    dynamic = {}
+    components = [Component(f"C{i}", tuple(round(rng.random(), 3) for _ in range(tupleSize))) for i in range(componentCount)]
+    for component in components: generator.addComponent(component)
+    jointSets = []
+    for index, (start, end) in enumerate(jointSetBounds(componentCount, jointSetSize, sizeDistribution, rng)):
+        jointSet = JointSet(components[start:end], f"O{index}")
+        jointSet.updateDynamicMap(dynamic)
+        generator.addJointSet(jointSet)
+        jointSets.append(jointSet)
+    jointSetCount = len(jointSets)
+    if depth is None:
+        for index, jointSet in enumerate(jointSets):
+            for component in jointSet.jointComponents:
+                slave = f"O{rng.randint(index + 1, min(jointSetCount - 1, index + window))}" if index < jointSetCount - 1 else ""
+                generator.addMappingToMu(component.id, slave)
+        return generator, dynamic
+    levels = levelBounds(jointSetCount, depth, fanIn)
+    for level, (start, end) in enumerate(levels):
+        for index in range(start, end):
+            slaves = [""]
+            if level < len(levels) - 1:
+                below, belowEnd = levels[level + 1]
+                first = below + (index - start) * (belowEnd - below) // (end - start)
+                slaves = [f"O{below + (first - below + offset) % (belowEnd - below)}" for offset in range(min(fanIn, belowEnd - below))]
+            for position, component in enumerate(jointSets[index].jointComponents):
+                generator.addMappingToMu(component.id, slaves[position % len(slaves)])
+    return generator, dynamic
+
+# (start, end) component ranges of consecutive joint sets
+def jointSetBounds(componentCount, jointSetSize, sizeDistribution, rng):
+    bounds = []
+    start = 0
+    while start < componentCount or not bounds:
+        if sizeDistribution == 'fixed':
+            size = jointSetSize
+        elif sizeDistribution == 'uniform':
+            size = rng.randint(1, 2 * jointSetSize - 1)
+        else:
+            size = max(1, round(rng.expovariate(1 / jointSetSize)))
+        bounds.append((start, min(componentCount, start + size)))
+        start += size
+    return bounds
+
+# (start, end) joint set ranges of each level, from the enders down; level l gets a share of the
+# joint sets proportional to fanIn**l, rounded up above the last level so that no level is more
+# than fanIn times larger than the one above it and every joint set gets a master
+def levelBounds(jointSetCount, depth, fanIn):
+    depth = max(1, min(depth, jointSetCount))
+    weights = [fanIn ** level for level in range(depth)]
+    sizes = [-(-jointSetCount * weight // sum(weights)) for weight in weights[:-1]]
+    sizes.append(jointSetCount - sum(sizes))
+    while sizes[-1] < 1: # too few joint sets for the rounding, the largest upper level gives some up
+        largest = max(range(depth - 1), key=sizes.__getitem__)
+        sizes[largest] -= 1
+        sizes[-1] += 1
+    bounds = []
+    start = 0
+    for size in sizes:
+        bounds.append((start, start + size))
+        start += size
+    return bounds
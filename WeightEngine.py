@@ -0,0 +1,28 @@
+import operator
+
+try:
+    import numpy as np
+except ImportError: # NumPy is optional, the pure-Python path below is used without it
+    np = None
+
+class WeightEngine:
+    def __init__(self, components, tupleSize, useNumpy=True):
+        self.components = components
+        self.tupleSize = tupleSize
+        self.names = [component.name for component in components]
+        self.vectorized = useNumpy and np is not None
+        if self.vectorized:
+            # One contiguous (components x tupleSize) float matrix per control
+            self.features = np.ascontiguousarray(
+                np.array([component.featureTuple for component in components], dtype=np.float64).reshape(len(components), tupleSize))
+        else:
+            self.features = [tuple(float(value) for value in component.featureTuple) for component in components]
+
+    # DOT Product of every component with the environment tuple (most optimisation problems are based on this)
+    def computeWeights(self, environmentTuple):
+        if self.vectorized:
+            return self.features @ np.asarray(environmentTuple, dtype=np.float64)
+        return [sum(map(operator.mul, environmentTuple, featureTuple)) for featureTuple in self.features]
+
+    def __len__(self):
+        return len(self.components)
@@ -0,0 +1,96 @@
+from array import array
+from bisect import bisect_right
+
+try:
+    import numpy as np
+except ImportError: # NumPy is optional, a flat float array is used as the matrix without it
+    np = None
+
+DEFAULT_HISTORY_SIZE = 1000 # ticks kept per control (~33 minutes at one tick every 2 s)
+
+# Fixed-capacity ring buffer of ticks for all components of a control: one shared timestamp
+# column plus a dense (ticks x components) weights matrix. The oldest ticks are dropped in O(1)
+# when the buffer is full or older than maxAge seconds.
+class WeightHistory:
+    def __init__(self, componentNames, capacity=DEFAULT_HISTORY_SIZE, maxAge=None, useNumpy=True):
+        if capacity < 1:
+            raise ValueError("capacity must be at least 1")
+        self.componentNames = list(componentNames)
+        self.columns = {name: column for column, name in enumerate(self.componentNames)}
+        self.width = len(self.componentNames)
+        self.capacity = capacity
+        self.maxAge = maxAge
+        self.timestamps = array('d', bytes(8 * capacity))
+        self.vectorized = useNumpy and np is not None
+        if self.vectorized:
+            self.weights = np.zeros((capacity, self.width), dtype=np.float64)
+        else:
+            self.weights = array('d', bytes(8 * capacity * self.width))
+        self.start = 0 # physical index of the oldest tick
+        self.size = 0
+
+    # Store the weights of every component (in componentNames order) sampled at one timestamp
+    def append(self, timestamp, weights):
+        if self.size == self.capacity:
+            self.start = (self.start + 1) % self.capacity
+            self.size -= 1
+        end = (self.start + self.size) % self.capacity
+        self.timestamps[end] = timestamp
+        if self.vectorized:
+            self.weights[end] = weights
+        else:
+            self.weights[end * self.width:(end + 1) * self.width] = array('d', weights)
+        self.size += 1
+        if self.maxAge is not None:
+            self.evictOlderThan(timestamp - self.maxAge)
+
+    def evictOlderThan(self, timestamp):
+        while self.size and self.timestamps[self.start] < timestamp:
+            self.start = (self.start + 1) % self.capacity
+            self.size -= 1
+
+    def latest(self):
+        if not self.size:
+            raise IndexError("empty weight history")
+        return self[self.size - 1]
+
+    # Tick closest in time to the given timestamp, found by binary search since ticks are appended
+    # in time order. A single search serves every component of the control.
+    def nearest(self, timestamp):
+        if not self.size:
+            raise IndexError("empty weight history")
+        index = bisect_right(TimestampIndex(self), timestamp)
+        if index == self.size or (index > 0 and timestamp - self.timestampAt(index - 1) < self.timestampAt(index) - timestamp):
+            index -= 1
+        return self[index]
+
+    def timestampAt(self, index):
+        return self.timestamps[(self.start + index) % self.capacity]
+
+    # Returns (weights row, timestamp); the row is indexed by component column
+    def __getitem__(self, index):
+        if index < 0: index += self.size
+        if not 0 <= index < self.size:
+            raise IndexError("weight history index out of range")
+        i = (self.start + index) % self.capacity
+        if self.vectorized:
+            return (self.weights[i], self.timestamps[i])
+        return (self.weights[i * self.width:(i + 1) * self.width], self.timestamps[i])
+
+    def __iter__(self):
+        for index in range(self.size):
+            yield self[index]
+
+    def __len__(self):
+        return self.size
+
+# Sorted read-only view over the timestamps of a history, in logical (oldest first) order, for bisect
+class TimestampIndex:
+    def __init__(self, history):
+        self.history = history
+
+    def __getitem__(self, index):
+        return self.history.timestampAt(index)
+
+    def __len__(self):
+        return self.history.size
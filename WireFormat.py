@@ -0,0 +1,116 @@
+import json
+import struct
+import zlib
+
+# Slave-to-master messages travel either as JSON text or, when both ends agree, in a compact
+# binary form: component names are replaced by their integer ID in the component index shipped
+# by the deployer, the weight is a float64 and the timestamp an int64 (microseconds).
+JSON_CONTENT_TYPE = 'application/json'
+BINARY_CONTENT_TYPE = 'application/x-weight-protocol'
+ACCEPTED_CONTENT_TYPES = BINARY_CONTENT_TYPE + ', ' + JSON_CONTENT_TYPE # advertised by masters that can decode both
+
+MAGIC = b'WP'
+VERSION = 1
+FLAG_PARTIAL = 1
+# magic, version, flags, index fingerprint, timestamp (us), roundID, weight, slaveID length, architecture length
+HEADER = struct.Struct('<2sBBIqqdHI')
+STRING_LENGTH = struct.Struct('<H')
+
+class WireFormatError(ValueError):
+    pass
+
+def encodeJson(message):
+    return json.dumps(message).encode('utf-8')
+
+def decodeJson(body):
+    return json.loads(body.decode('utf-8'))
+
+# Encodes and decodes binary messages against one component index; both ends must hold the same
+# index, which is checked through its fingerprint. Names missing from the index are carried inline.
+class WireCodec:
+    def __init__(self, componentIndex):
+        self.componentIndex = list(componentIndex)
+        self.componentIDs = {name: componentID for componentID, name in enumerate(self.componentIndex)}
+        self.fingerprint = zlib.crc32('\n'.join(self.componentIndex).encode('utf-8'))
+
+    # Only messages with an integer round (the ones created by initiators) have a binary form
+    def canEncode(self, message):
+        return isinstance(message.get('roundID'), int)
+
+    def encode(self, message):
+        slaveID = message['slaveID'].encode('utf-8')
+        inline = []
+        architecture = []
+        for name in message['slaveArchitecture']:
+            componentID = self.componentIDs.get(name)
+            if componentID is None:
+                componentID = len(self.componentIndex) + len(inline)
+                inline.append(name.encode('utf-8'))
+            architecture.append(componentID)
+        parts = [HEADER.pack(MAGIC, VERSION, FLAG_PARTIAL if message.get('partial') else 0, self.fingerprint,
+                             round(message['initiatorTimestamp'] * 1e6), message['roundID'], message['slaveWeight'],
+                             len(slaveID), len(architecture)),
+                 slaveID, struct.pack(f'<{len(architecture)}I', *architecture), STRING_LENGTH.pack(len(inline))]
+        for name in inline:
+            parts.append(STRING_LENGTH.pack(len(name)))
+            parts.append(name)
+        return b''.join(parts)
+
+    def decode(self, body):
+        try:
+            magic, version, flags, fingerprint, timestamp, roundID, weight, slaveIDLength, architectureLength = HEADER.unpack_from(body)
+            if magic != MAGIC or version != VERSION:
+                raise WireFormatError("not a weight protocol message")
+            if fingerprint != self.fingerprint:
+                raise WireFormatError("component index differs from the sender's")
+            offset = HEADER.size
+            slaveID = body[offset:offset + slaveIDLength].decode('utf-8')
+            offset += slaveIDLength
+            architecture = struct.unpack_from(f'<{architectureLength}I', body, offset)
+            offset += 4 * architectureLength
+            inline = []
+            inlineCount = STRING_LENGTH.unpack_from(body, offset)[0]
+            offset += STRING_LENGTH.size
+            for _ in range(inlineCount):
+                length = STRING_LENGTH.unpack_from(body, offset)[0]
+                offset += STRING_LENGTH.size
+                inline.append(body[offset:offset + length].decode('utf-8'))
+                offset += length
+        except struct.error as e:
+            raise WireFormatError(f"truncated message: {e}")
+        names = self.componentIndex
+        return {'slaveID': slaveID,
+                'slaveArchitecture': [names[i] if i < len(names) else inline[i - len(names)] for i in architecture],
+                'slaveWeight': weight,
+                'initiatorTimestamp': timestamp / 1e6,
+                'roundID': roundID,
+                'partial': bool(flags & FLAG_PARTIAL)}
+
+# Messages from the controls of one manager to the controls of another, coalesced into a single
+# request: a sequence of frames (masterID, content type, encoded message)
+BATCH_CONTENT_TYPE = 'application/x-weight-protocol-batch'
+FRAME_HEADER = struct.Struct('<HBI') # masterID length, binary flag, message length
+
+def encodeBatch(frames):
+    parts = []
+    for masterID, contentType, body in frames:
+        masterID = masterID.encode('utf-8')
+        parts.append(FRAME_HEADER.pack(len(masterID), contentType == BINARY_CONTENT_TYPE, len(body)))
+        parts.append(masterID)
+        parts.append(body)
+    return b''.join(parts)
+
+def decodeBatch(body):
+    frames = []
+    offset = 0
+    try:
+        while offset < len(body):
+            masterIDLength, binary, length = FRAME_HEADER.unpack_from(body, offset)
+            offset += FRAME_HEADER.size
+            masterID = body[offset:offset + masterIDLength].decode('utf-8')
+            offset += masterIDLength
+            frames.append((masterID, BINARY_CONTENT_TYPE if binary else JSON_CONTENT_TYPE, body[offset:offset + length]))
+            offset += length
+    except struct.error as e:
+        raise WireFormatError(f"truncated batch: {e}")
+    return frames